@@ -63,10 +63,14 @@ setup(
             "termexplain=termexplain.cli:main",
             "explain=termexplain.cli:main",
         ],
+        "pytest11": [
+            "termexplain = termexplain.pytest_plugin",
+        ],
     },
     include_package_data=True,
     package_data={
         "": ["*.md", "*.txt", "*.sh"],
+        "termexplain": ["shell/hook.*"],
     },
     keywords="cli, error, explanation, ai, gemini, terminal, debugging",
     project_urls={
@@ -0,0 +1,133 @@
+"""
+Python API for termExplain
+
+Explains errors from Python code without going through the CLI. One
+Explainer reuses a single GeminiClient, PromptBuilder and cache for every
+call and is safe to share between threads.
+
+Example:
+    from termexplain.api import explain_many
+
+    for result in explain_many(["NameError: name 'x' is not defined", "Permission denied"]):
+        print(result['explanation'])
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from termexplain.gemini_client import GeminiClient
+from termexplain.prompt_builder import PromptBuilder
+from termexplain.utils.cache import ErrorCache
+from termexplain.utils.formatter import OutputFormatter
+from termexplain.utils.singleflight import SingleFlight
+from termexplain.utils.tiered_cache import RemoteCache, TieredCache
+
+class Explainer:
+    """Thread-safe explain pipeline: cache, prompt, Gemini, parsed sections."""
+
+    def __init__(self, api_key: Optional[str] = None, gemini_client=None, prompt_builder=None, cache=None,
+                 shared_cache: Optional[str] = None, max_workers: int = 4, save: bool = True):
+        """
+        Initialize the explainer.
+
+        Args:
+            api_key: Gemini API key (default: $GEMINI_API_KEY)
+            gemini_client: Client to use instead of creating one
+            prompt_builder: Prompt builder to use instead of creating one
+            cache: Cache to use instead of the default tiered cache
+            shared_cache: Shared cache server as host:port (default: $TERMEXPLAIN_SHARED_CACHE)
+            max_workers: Maximum concurrent model calls in explain_many
+            save: Cache fresh explanations
+        """
+        self.gemini_client = gemini_client or GeminiClient(api_key)
+        self.prompt_builder = prompt_builder or PromptBuilder()
+        if cache is None:
+            shared_cache = shared_cache or os.getenv('TERMEXPLAIN_SHARED_CACHE')
+            cache = TieredCache(ErrorCache(), RemoteCache(shared_cache) if shared_cache else None)
+        self.cache = cache
+        self.formatter = OutputFormatter(pretty=False)
+        self.single_flight = SingleFlight(os.path.join(self.cache.cache_dir, "locks"))
+        self.max_workers = max_workers
+        self.save = save
+
+    def explain(self, error_text: str, no_cache: bool = False) -> Dict[str, Any]:
+        """
+        Explain one error.
+
+        Args:
+            error_text: The error text
+            no_cache: Skip the cache lookup
+
+        Returns:
+            Result dictionary with error, explanation, sections and cached;
+            on failure explanation is None and failed holds the reason
+        """
+        try:
+            explanation = None if no_cache else self.cache.get(error_text)
+            cached = explanation is not None
+            if not cached:
+                route = self.prompt_builder.route(error_text)
+                prompt = self.prompt_builder.build_prompt(error_text, route)
+                # Threads (and other processes) asking about the same error share one call
+                explanation, shared = self.single_flight.do(
+                    self.cache.cache_key(error_text), lambda: self.gemini_client.get_explanation(prompt, route)
+                )
+                if self.save and not shared:
+                    self.cache.save(error_text, explanation)
+        except Exception as e:
+            return {'error': error_text, 'explanation': None, 'sections': [], 'cached': False, 'failed': str(e)}
+
+        return {
+            'error': error_text,
+            'explanation': explanation,
+            'sections': self.formatter.parse_sections(explanation),
+            'cached': cached,
+        }
+
+    def explain_many(self, errors: Iterable[str], no_cache: bool = False) -> List[Dict[str, Any]]:
+        """
+        Explain many errors concurrently.
+
+        Duplicates are explained once; results come back in input order.
+
+        Args:
+            errors: Error texts
+            no_cache: Skip the cache lookup
+
+        Returns:
+            One result dictionary per input error
+        """
+        errors = list(errors)
+        unique = list(dict.fromkeys(errors))
+        if len(unique) <= 1:
+            results = {error: self.explain(error, no_cache) for error in unique}
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique))) as pool:
+                results = dict(zip(unique, pool.map(lambda error: self.explain(error, no_cache), unique)))
+        return [results[error] for error in errors]
+
+_default_explainer: Optional[Explainer] = None
+_default_lock = threading.Lock()
+
+def get_explainer() -> Explainer:
+    """
+    Get the process-wide Explainer, creating it on first use.
+
+    Returns:
+        Shared Explainer instance
+    """
+    global _default_explainer
+    with _default_lock:
+        if _default_explainer is None:
+            _default_explainer = Explainer()
+        return _default_explainer
+
+def explain(error_text: str, no_cache: bool = False) -> Dict[str, Any]:
+    """Explain one error with the shared Explainer. See Explainer.explain."""
+    return get_explainer().explain(error_text, no_cache)
+
+def explain_many(errors: Iterable[str], no_cache: bool = False) -> List[Dict[str, Any]]:
+    """Explain many errors with the shared Explainer. See Explainer.explain_many."""
+    return get_explainer().explain_many(errors, no_cache)
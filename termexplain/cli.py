@@ -9,19 +9,29 @@ import sys
 import click
 import subprocess
 import os
+import threading
+import time
+from datetime import datetime
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.syntax import Syntax
 from rich.prompt import Prompt
+from rich.table import Table
 
-from termexplain.gemini_client import GeminiClient
+from termexplain.fallbacks import fallback_explanation
 from termexplain.prompt_builder import PromptBuilder
-from termexplain.utils.formatter import OutputFormatter
-from termexplain.utils.cache import ErrorCache
+from termexplain.routing import RouteStats, load_routes
+from termexplain.utils.fingerprint import fingerprint
+# The Gemini SDK, caches, follow mode and the server are imported by the
+# commands that use them: `eval "$(explain hook bash)"` runs in every new shell
+from termexplain.shell_hook import SUPPORTED_SHELLS, get_hook_script, read_last_failure, format_failure
 
 console = Console()
 
+# Shortest partial streamed response worth showing at a deadline
+MIN_PARTIAL_CHARS = 80
+
 def run_file_and_catch_errors(file_path):
     """
     Run a Python or JavaScript file and return any error output.
@@ -72,15 +82,80 @@ def run_file_and_catch_errors(file_path):
     except Exception as e:
         return False, "", f"Error running file: {e}"
 
-@click.command()
+def run_file_and_report(file_path):
+    """
+    Run a file and print the outcome.
+    
+    Args:
+        file_path: Path to the file to run
+        
+    Returns:
+        The error output if the file failed, otherwise None
+    """
+    console.print(f"[blue]🚀 Running file: {file_path}[/blue]")
+    success, stdout, stderr = run_file_and_catch_errors(file_path)
+    
+    if success:
+        console.print("[green]✅ File executed successfully![/green]")
+        if stdout.strip():
+            console.print("[blue]Output:[/blue]")
+            console.print(stdout)
+        return None
+    
+    error_input = stderr.strip() if stderr.strip() else stdout.strip()
+    if not error_input:
+        error_input = "Unknown error occurred while running the file"
+    
+    console.print(f"[red]❌ File execution failed[/red]")
+    console.print(f"[yellow]Error: {error_input}[/yellow]")
+    return error_input
+
+class ExplainGroup(click.Group):
+    """Command group that runs `explain` unless a subcommand is named."""
+    
+    default_command = 'explain'
+    
+    def parse_args(self, ctx, args):
+        # A bare --help describes the group, so the other commands are listed
+        if args and (args[0] in self.commands or args == ['--help']):
+            return super().parse_args(ctx, args)
+        return super().parse_args(ctx, [self.default_command] + list(args))
+    
+    def format_usage(self, ctx, formatter):
+        formatter.write_usage(ctx.command_path, "[OPTIONS] [ERROR_TEXT] | COMMAND [ARGS]...")
+    
+    def format_help_text(self, ctx, formatter):
+        self.commands[self.default_command].format_help_text(ctx, formatter)
+    
+    def format_options(self, ctx, formatter):
+        # Options of the default command first, then the other commands
+        self.commands[self.default_command].format_options(ctx, formatter)
+        self.format_commands(ctx, formatter)
+
+@click.group(cls=ExplainGroup)
+def main():
+    """Explain terminal errors using AI."""
+
+@main.command('explain')
 @click.argument('error_text', required=False)
 @click.option('--save', is_flag=True, help='Cache the explanation for future use')
 @click.option('--pretty', is_flag=True, default=True, help='Format output with colors and styling')
 @click.option('--no-cache', is_flag=True, help='Skip cache and always fetch fresh explanation')
 @click.option('--api-key', envvar='GEMINI_API_KEY', help='Gemini API key (or set GEMINI_API_KEY env var)')
 @click.option('--file', 'file_path', help='Run a Python or JavaScript file and explain any errors')
+@click.option('--follow', 'follow_paths', multiple=True, help='Follow a log file and explain new errors as they appear (repeatable)')
+@click.option('--window', default=300.0, show_default=True, help='With --follow: seconds before the same error is explained again')
+@click.option('--max-per-minute', default=10, show_default=True, help='With --follow: maximum explanations per minute')
+@click.option('--from-start', is_flag=True, help='With --follow: also explain errors already in the file')
+@click.option('--shared-cache', envvar='TERMEXPLAIN_SHARED_CACHE', help='Shared cache server as host:port (memcached protocol)')
+@click.option('--hedge', 'hedge_percentile', type=float, envvar='TERMEXPLAIN_HEDGE',
+              help='Send a duplicate request once the first is slower than this percentile of recent requests (e.g. 0.95)')
+@click.option('--deadline', type=float, envvar='TERMEXPLAIN_DEADLINE',
+              help='Answer within this many seconds, falling back to a similar cached or offline explanation')
+@click.option('--watch', is_flag=True, help='With --file: re-run when the file or its sibling sources change')
 @click.version_option(version='1.0.0', prog_name='termExplain')
-def main(error_text, save, pretty, no_cache, api_key, file_path):
+def explain(error_text, save, pretty, no_cache, api_key, file_path, follow_paths, window, max_per_minute, from_start,
+            shared_cache, hedge_percentile, deadline, watch):
     """
     Explain terminal errors using AI.
     
@@ -92,37 +167,55 @@ def main(error_text, save, pretty, no_cache, api_key, file_path):
         termExplain --save "Permission denied"
         termExplain --file my_script.py
         termExplain --file app.js
+        termExplain --file app.py --watch
+        termExplain --follow /var/log/app.log
+    
+    With the shell hook installed, a bare `termExplain` explains the last
+    failed command. Manage the local cache with `termExplain cache --help`.
     """
+    # The deadline covers the whole run, including startup and --file
+    deadline_at = time.monotonic() + deadline if deadline else None
+    
+    if watch and not file_path:
+        console.print("[red]--watch needs --file[/red]")
+        sys.exit(1)
+    
+    from termexplain.utils.formatter import OutputFormatter
+    from termexplain.utils.singleflight import SingleFlight
     
     # Initialize components
     try:
-        gemini_client = GeminiClient(api_key)
+        cache = build_cache(shared_cache)
+        gemini_client = build_client(api_key, hedge_percentile, cache.cache_dir)
         prompt_builder = PromptBuilder()
         formatter = OutputFormatter(pretty)
-        cache = ErrorCache()
+        single_flight = SingleFlight(os.path.join(cache.cache_dir, "locks"))
     except Exception as e:
         console.print(f"[red]Error initializing components: {e}[/red]")
         sys.exit(1)
     
+    # Handle --follow option
+    if follow_paths:
+        follow_logs(follow_paths, gemini_client, prompt_builder, formatter, cache, no_cache, save,
+                    window, max_per_minute, from_start, single_flight)
+        return
+    
+    # Handle --file --watch
+    if file_path and watch:
+        watch_file(file_path, gemini_client, prompt_builder, formatter, cache, no_cache, save, single_flight,
+                   deadline)
+        return
+    
+    prompt = None
+    
     # Handle --file option
     if file_path:
-        console.print(f"[blue]🚀 Running file: {file_path}[/blue]")
-        success, stdout, stderr = run_file_and_catch_errors(file_path)
-        
-        if success:
-            console.print("[green]✅ File executed successfully![/green]")
-            if stdout.strip():
-                console.print("[blue]Output:[/blue]")
-                console.print(stdout)
+        error_input = run_file_and_report(file_path)
+        if error_input is None:
             return
-        else:
-            # File failed - explain the error
-            error_input = stderr.strip() if stderr.strip() else stdout.strip()
-            if not error_input:
-                error_input = "Unknown error occurred while running the file"
-            
-            console.print(f"[red]❌ File execution failed[/red]")
-            console.print(f"[yellow]Error: {error_input}[/yellow]")
+        
+        # Send the failing frames and their source instead of the raw log
+        prompt = prompt_builder.build_traceback_prompt(error_input, base_dir=os.getcwd())
     
     # Get error text from argument or stdin (if not using --file)
     elif error_text:
@@ -131,40 +224,544 @@ def main(error_text, save, pretty, no_cache, api_key, file_path):
         # Read from stdin if piped
         error_input = sys.stdin.read().strip()
     else:
-        # Interactive mode
-        console.print("[yellow]No error text provided. Enter your error below:[/yellow]")
-        error_input = Prompt.ask("Error text")
+        last_failure = read_last_failure()
+        if last_failure:
+            # Recorded by the shell hook (`explain hook <shell>`)
+            console.print(f"[blue]🔁 Explaining last failed command: {last_failure['command']}[/blue]")
+            error_input = format_failure(last_failure)
+        else:
+            # Interactive mode
+            console.print("[yellow]No error text provided. Enter your error below:[/yellow]")
+            error_input = Prompt.ask("Error text")
     
     if not error_input:
         console.print("[red]No error text provided. Use --help for usage information.[/red]")
         sys.exit(1)
     
+    try:
+        explain_error(error_input, gemini_client, prompt_builder, formatter, cache, no_cache, save,
+                      single_flight, prompt, deadline_at)
+    except Exception as e:
+        console.print(f"[red]❌ Error getting explanation: {e}[/red]")
+        sys.exit(1)
+
+def build_client(api_key, hedge_percentile=None, cache_dir=None):
+    """
+    Build the Gemini client.
+    
+    Args:
+        api_key: Gemini API key
+        hedge_percentile: Enable hedged requests at this latency percentile (optional)
+        cache_dir: Where recent latencies and per-route statistics are kept between runs
+        
+    Returns:
+        GeminiClient
+    """
+    from termexplain.gemini_client import GeminiClient, HedgingPolicy
+    
+    route_stats_file = os.path.join(cache_dir, "route_stats.json") if cache_dir else None
+    if not hedge_percentile:
+        return GeminiClient(api_key, route_stats_file=route_stats_file)
+    history_file = os.path.join(cache_dir, "latency.json") if cache_dir else None
+    return GeminiClient(api_key, hedging=HedgingPolicy(percentile=hedge_percentile),
+                        latency_history_file=history_file, route_stats_file=route_stats_file)
+
+def build_cache(shared_cache=None):
+    """
+    Build the cache used for explanations.
+    
+    Args:
+        shared_cache: Shared cache server as host:port (optional)
+        
+    Returns:
+        TieredCache over memory, the local disk cache and the shared tier
+    """
+    from termexplain.utils.cache import ErrorCache
+    from termexplain.utils.tiered_cache import RemoteCache, TieredCache
+    
+    remote = RemoteCache(shared_cache) if shared_cache else None
+    return TieredCache(ErrorCache(), remote)
+
+def explain_error(error_input, gemini_client, prompt_builder, formatter, cache, no_cache=False, save=False,
+                  single_flight=None, prompt=None, deadline=None):
+    """
+    Explain one error: check the cache, ask Gemini on a miss, and display the result.
+    
+    Args:
+        error_input: The error text to explain
+        no_cache: Skip the cache lookup
+        save: Cache the fresh explanation
+        single_flight: Coalesces identical concurrent requests (optional)
+        prompt: Prompt to send instead of the default one for error_input
+        deadline: time.monotonic() value by which to answer; past it a
+            degraded explanation is shown instead of failing (optional)
+        
+    Returns:
+        The explanation shown, or None if it was a degraded answer
+        
+    Raises:
+        Exception: If the explanation could not be fetched and there is no deadline
+    """
     # Check cache first (unless --no-cache is specified)
     if not no_cache:
         cached_explanation = cache.get(error_input)
         if cached_explanation:
             console.print("[green]Found cached explanation:[/green]")
             formatter.display_explanation(cached_explanation)
-            return
+            return cached_explanation
     
     # Get explanation from Gemini
-    try:
-        console.print("[blue]🤖 Analyzing error[/blue]")
-        
-        prompt = prompt_builder.build_prompt(error_input)
-        explanation = gemini_client.get_explanation(prompt)
-        
-        # Display the explanation
-        formatter.display_explanation(explanation)
+    console.print("[blue]🤖 Analyzing error[/blue]")
+    
+    # Simple errors go to a cheaper model with a shorter prompt and output budget
+    route = prompt_builder.route(error_input, prompt)
+    if prompt is None:
+        prompt = prompt_builder.build_prompt(error_input, route)
+    if deadline is not None:
+        explanation, degraded = fetch_before_deadline(error_input, prompt, gemini_client, prompt_builder, cache,
+                                                      single_flight, deadline, route)
+        if degraded:
+            # Degraded answers are never cached
+            formatter.display_warning(f"Degraded answer: {degraded}")
+            formatter.display_explanation(explanation)
+            return None
+    elif single_flight:
+        # Concurrent callers with the same error wait for one request
+        explanation, shared = single_flight.do(
+            cache.cache_key(error_input), lambda: gemini_client.get_explanation(prompt, route)
+        )
+        if shared:
+            console.print("[green]Reused explanation from a concurrent request:[/green]")
+    else:
+        explanation = gemini_client.get_explanation(prompt, route)
+    
+    # Display the explanation
+    formatter.display_explanation(explanation)
+    
+    # Cache if requested
+    if save:
+        cache.save(error_input, explanation)
+        console.print("[green]✅ Explanation saved to cache[/green]")
+    return explanation
+
+def fetch_before_deadline(error_input, prompt, gemini_client, prompt_builder, cache, single_flight, deadline,
+                          route=None):
+    """
+    Stream an explanation from Gemini, degrading gracefully if it isn't done by the deadline.
+    
+    A near-match from the cache is looked up while the request is in flight.
+    At the deadline the first available of these is used: the near-match,
+    the partial streamed response, or an offline explanation for the error
+    category. A hedging client hedges the request instead of streaming it
+    (see GeminiClient.stream_explanation), so there is no partial response.
+    
+    Args:
+        error_input: The error text to explain
+        prompt: Prompt to send
+        deadline: time.monotonic() value by which to answer
+        route: Model route for the request (optional)
         
-        # Cache if requested
-        if save:
-            cache.save(error_input, explanation)
-            console.print("[green]✅ Explanation saved to cache[/green]")
+    Returns:
+        tuple: (explanation: str, degraded: reason string, or None for a full answer)
+    """
+    chunks = []
+    result = {}
+    done = threading.Event()
+    
+    def fetch():
+        stream = lambda: gemini_client.stream_explanation(prompt, chunks.append, route)
+        try:
+            if single_flight:
+                result['explanation'], _ = single_flight.do(cache.cache_key(error_input), stream)
+            else:
+                result['explanation'] = stream()
+        except Exception as e:
+            result['error'] = e
+        finally:
+            done.set()
+    
+    def find_near_match():
+        try:
+            result['near_match'] = cache.find_similar(error_input)
+        except Exception as e:
+            result['near_match'] = None
+            console.print(f"[yellow]Near-match lookup failed: {e}[/yellow]")
+    
+    # Daemon threads: the process may exit with the request still in flight
+    threading.Thread(target=fetch, name="termexplain-fetch", daemon=True).start()
+    matcher = threading.Thread(target=find_near_match, name="termexplain-near-match", daemon=True)
+    matcher.start()
+    
+    done.wait(max(0.0, deadline - time.monotonic()))
+    if 'explanation' in result:
+        return result['explanation'], None
+    
+    reason = (f"Gemini request failed ({result['error']})" if 'error' in result
+              else "Gemini did not answer before the deadline")
+    
+    matcher.join(max(0.0, deadline - time.monotonic()))
+    near_match = result.get('near_match')
+    if near_match:
+        return (near_match['explanation'],
+                f"{reason}; showing the explanation of a similar cached error "
+                f"({near_match['similarity']:.0%} similar).")
+    
+    partial = "".join(chunks).strip()
+    if len(partial) >= MIN_PARTIAL_CHARS:
+        return partial + "\n\n*(response cut off at the deadline)*", f"{reason}; showing the partial response."
+    
+    error_type = prompt_builder.detect_error_type(error_input)
+    return (fallback_explanation(error_input, error_type),
+            f"{reason}; showing a generic offline explanation{f' for {error_type} errors' if error_type else ''}.")
+
+def watch_file(file_path, gemini_client, prompt_builder, formatter, cache, no_cache, save, single_flight=None,
+               deadline=None):
+    """
+    Run a file, explain its failure, and run it again whenever its sources change.
+    
+    Failures are fingerprinted; one already explained in this session is shown
+    again straight away instead of asking the model.
+    
+    Args:
+        file_path: Path to the file to run
+        deadline: Seconds each explanation may take (optional)
+    """
+    from termexplain.utils.follow import FileWatcher, wait_for_source_change
+    
+    # fingerprint -> explanation shown for it
+    explained = {}
+    watcher = FileWatcher([file_path])
+    try:
+        while True:
+            error_input = run_file_and_report(file_path)
+            if error_input is not None:
+                key = fingerprint(error_input)
+                if key in explained:
+                    console.print(f"[green]Same failure as an earlier run ({key[:8]}):[/green]")
+                    formatter.display_explanation(explained[key])
+                else:
+                    try:
+                        prompt = prompt_builder.build_traceback_prompt(error_input, base_dir=os.getcwd())
+                        explanation = explain_error(error_input, gemini_client, prompt_builder, formatter, cache,
+                                                    no_cache, save, single_flight, prompt,
+                                                    time.monotonic() + deadline if deadline else None)
+                        if explanation is not None:
+                            explained[key] = explanation
+                    except Exception as e:
+                        # Keep watching; the next run gets another chance
+                        console.print(f"[red]❌ Error getting explanation: {e}[/red]")
             
+            console.print(f"[blue]👀 Watching {file_path} and its sibling sources (Ctrl-C to stop)[/blue]")
+            changed = wait_for_source_change(file_path, watcher)
+            console.print(f"[blue]🔁 Changed: {', '.join(os.path.relpath(path) for path in changed)}[/blue]")
+    except KeyboardInterrupt:
+        console.print("[blue]Stopped watching[/blue]")
+    finally:
+        watcher.close()
+
+def follow_logs(paths, gemini_client, prompt_builder, formatter, cache, no_cache, save,
+                window, max_per_minute, from_start, single_flight=None):
+    """
+    Follow log files and explain each new unique error as it appears.
+    
+    Args:
+        paths: Log files to follow
+        window: Minimum seconds between explanations of the same error
+        max_per_minute: Maximum explanations per minute across all errors
+        from_start: Also explain errors already in the files
+    """
+    from termexplain.utils.follow import follow_errors
+    
+    def on_error(record, key, occurrences):
+        source = f" (seen {occurrences}x)" if occurrences > 1 else ""
+        console.print(f"[red]❌ New error ({key[:8]}){source}:[/red]")
+        console.print(f"[yellow]{record}[/yellow]")
+        try:
+            explain_error(record, gemini_client, prompt_builder, formatter, cache, no_cache, save,
+                          single_flight)
+        except Exception as e:
+            # Keep following; the next occurrence gets another chance
+            console.print(f"[red]❌ Error getting explanation: {e}[/red]")
+    
+    console.print(f"[blue]👀 Following {', '.join(paths)} (Ctrl-C to stop)[/blue]")
+    try:
+        follow_errors(paths, on_error, window_seconds=window, max_per_minute=max_per_minute,
+                      from_start=from_start)
+    except KeyboardInterrupt:
+        console.print("[blue]Stopped following[/blue]")
+
+@main.command()
+@click.argument('shell', type=click.Choice(SUPPORTED_SHELLS))
+def hook(shell):
+    """
+    Print the shell hook that records failed commands.
+    
+    Add `eval "$(explain hook bash)"` to ~/.bashrc (zsh likewise), or
+    `explain hook fish | source` to config.fish.
+    
+    Set TERMEXPLAIN_CAPTURE_STDERR=1 before the hook (bash and zsh) to also
+    record the tail of stderr. Stderr then goes through a pipe, so programs
+    stop seeing a terminal there: colour diagnostics and progress bars turn
+    off, and error output may appear after the next prompt.
+    """
+    click.echo(get_hook_script(shell), nl=False)
+
+@main.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to bind')
+@click.option('--port', default=8765, show_default=True, help='Port to listen on')
+@click.option('--workers', default=4, show_default=True, help='Maximum concurrent model calls')
+@click.option('--no-save', is_flag=True, help='Do not cache fresh explanations')
+@click.option('--api-key', envvar='GEMINI_API_KEY', help='Gemini API key (or set GEMINI_API_KEY env var)')
+@click.option('--shared-cache', envvar='TERMEXPLAIN_SHARED_CACHE', help='Shared cache server as host:port (memcached protocol)')
+@click.option('--hedge', 'hedge_percentile', type=float, envvar='TERMEXPLAIN_HEDGE',
+              help='Send a duplicate request once the first is slower than this percentile of recent requests (e.g. 0.95)')
+def serve(host, port, workers, no_save, api_key, shared_cache, hedge_percentile):
+    """
+    Serve explanations over a local HTTP/JSON API.
+    
+    POST /explain with {"error": "..."} or {"errors": [...]}; GET /metrics
+    for request rate, cache hit ratio and latency histograms.
+    """
+    from termexplain.server import ExplainService, run_server
+    from termexplain.utils.formatter import OutputFormatter
+    
+    try:
+        cache = build_cache(shared_cache)
+        gemini_client = build_client(api_key, hedge_percentile, cache.cache_dir)
+        service = ExplainService(gemini_client, PromptBuilder(), OutputFormatter(False), cache,
+                                 max_upstream=workers, save=not no_save)
     except Exception as e:
-        console.print(f"[red]❌ Error getting explanation: {e}[/red]")
+        console.print(f"[red]Error initializing components: {e}[/red]")
         sys.exit(1)
+    
+    def on_ready(address):
+        console.print(f"[blue]🌐 Serving on http://{address[0]}:{address[1]} (Ctrl-C to stop)[/blue]")
+    
+    try:
+        run_server(service, host, port, on_ready)
+    except KeyboardInterrupt:
+        console.print("[blue]Server stopped[/blue]")
+
+@main.command()
+@click.option('--cache-dir', help='Cache directory (default: ~/.cache/termexplain)')
+def routes(cache_dir):
+    """
+    Show the model routing table and recorded latency and tokens per route.
+    
+    Set TERMEXPLAIN_ROUTES to a JSON file to replace the table.
+    """
+    from termexplain.utils.cache import default_cache_dir
+    
+    stats = RouteStats(os.path.join(cache_dir or default_cache_dir(), "route_stats.json")).to_dict()
+    
+    table = Table(title="termExplain routes")
+    table.add_column("Route", style="cyan")
+    table.add_column("Max score", justify="right")
+    table.add_column("Model")
+    table.add_column("Max tokens", justify="right")
+    table.add_column("Template")
+    table.add_column("Calls", style="green", justify="right")
+    table.add_column("Mean latency", style="green", justify="right")
+    table.add_column("Mean tokens in/out", style="green", justify="right")
+    for route in load_routes():
+        recorded = stats.get(route.name)
+        table.add_row(
+            route.name,
+            "any" if route.max_score is None else str(route.max_score),
+            route.model,
+            str(route.max_output_tokens),
+            route.template,
+            str(recorded['calls']) if recorded else "0",
+            f"{recorded['mean_latency_ms']:.0f} ms" if recorded else "-",
+            f"{recorded['mean_prompt_tokens']:.0f} / {recorded['mean_output_tokens']:.0f}" if recorded else "-",
+        )
+    console.print(table)
+
+@main.group()
+@click.option('--cache-dir', help='Cache directory (default: ~/.cache/termexplain)')
+@click.pass_context
+def cache(ctx, cache_dir):
+    """Inspect and maintain the local explanation cache."""
+    from termexplain.utils.cache import ErrorCache
+    
+    ctx.obj = ErrorCache(cache_dir)
+
+@cache.command()
+@click.pass_obj
+def stats(error_cache):
+    """Show cache statistics."""
+    table = Table(title="termExplain cache")
+    table.add_column("Statistic", style="cyan")
+    table.add_column("Value", style="green")
+    for key, value in error_cache.get_stats().items():
+        table.add_row(key.replace('_', ' '), str(value))
+    console.print(table)
+
+@cache.command()
+@click.option('--all', 'clear_everything', is_flag=True, help='Remove every entry, not just expired ones')
+@click.pass_obj
+def prune(error_cache, clear_everything):
+    """Remove expired entries."""
+    if clear_everything:
+        count = len(error_cache.cache_data)
+        error_cache.clear_all()
+    else:
+        count = error_cache.clear_expired()
+    console.print(f"[green]✅ Removed {count} entries[/green]")
+
+@cache.command()
+@click.argument('output', type=click.File('w', encoding='utf-8'), default='-')
+@click.pass_obj
+def export(error_cache, output):
+    """Export entries as JSON Lines to OUTPUT (default: stdout)."""
+    count = error_cache.export_jsonl(output)
+    if output is not sys.stdout:
+        console.print(f"[green]✅ Exported {count} entries[/green]")
+
+@cache.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'), default='-')
+@click.pass_obj
+def import_(error_cache, source):
+    """Import entries from a JSON Lines file (default: stdin)."""
+    count = error_cache.import_jsonl(source)
+    console.print(f"[green]✅ Imported {count} entries[/green]")
+
+@cache.command()
+@click.argument('query', nargs=-1, required=True)
+@click.option('--limit', default=20, show_default=True, help='Maximum number of results')
+@click.pass_obj
+def search(error_cache, query, limit):
+    """Find cached entries containing every word of QUERY."""
+    results = error_cache.search(' '.join(query), limit)
+    if not results:
+        console.print("[yellow]No matching entries[/yellow]")
+        return
+    for entry in results:
+        first_line = entry.get('error_text', '').strip().splitlines()[-1:] or ['']
+        console.print(f"[cyan]{entry['hash'][:12]}[/cyan] {entry.get('timestamp', '')[:19]}  {first_line[0][:100]}")
+
+@cache.command()
+@click.option('--retrain', is_flag=True, help='Retrain the compression dictionary (compressed storage only)')
+@click.pass_obj
+def vacuum(error_cache, retrain):
+    """Compact the cache file and search index."""
+    result = error_cache.vacuum(retrain=retrain)
+    console.print(f"[green]✅ Cache compacted: {result['before_bytes']} -> {result['after_bytes']} bytes[/green]")
+
+def format_seen(timestamp):
+    """Format a Unix time for index listings."""
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+
+def error_summary(sample, width=90):
+    """The line of an error record that names the error, shortened."""
+    lines = [line.strip() for line in sample.strip().splitlines() if line.strip()]
+    return (lines[-1] if lines else '')[:width]
+
+@main.group()
+@click.option('--cache-dir', help='Cache directory (default: ~/.cache/termexplain)')
+@click.pass_context
+def index(ctx, cache_dir):
+    """Find recurring errors in archived logs."""
+    from termexplain.utils.cache import default_cache_dir
+    from termexplain.utils.log_index import LogIndex
+    
+    ctx.obj = LogIndex(cache_dir or default_cache_dir())
+
+@index.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--workers', type=int, help='Worker processes (default: one per CPU)')
+@click.pass_obj
+def scan(log_index, paths, workers):
+    """Scan log files and directories (plain or .gz) into the index."""
+    start = time.monotonic()
+    result = log_index.scan(paths, workers)
+    elapsed = time.monotonic() - start
+    console.print(
+        f"[green]✅ Scanned {result['files_scanned']} files ({result['files_unchanged']} unchanged, "
+        f"{result['files_failed']} failed): {result['records']} error records in {elapsed:.1f}s[/green]"
+    )
+
+@index.command()
+@click.option('--limit', default=20, show_default=True, help='Maximum number of errors')
+@click.option('--days', type=float, help='Only errors seen in the last DAYS days')
+@click.pass_obj
+def top(log_index, limit, days):
+    """List the most frequent errors."""
+    since = time.time() - days * 86400 if days else None
+    start = time.monotonic()
+    results = log_index.top(limit, since)
+    elapsed_ms = (time.monotonic() - start) * 1000
+    if not results:
+        console.print("[yellow]No errors indexed; run `termExplain index scan PATH`[/yellow]")
+        return
+    
+    table = Table(title=f"Most frequent errors ({elapsed_ms:.1f} ms)")
+    table.add_column("Fingerprint", style="cyan")
+    table.add_column("Count", style="green", justify="right")
+    table.add_column("Files", justify="right")
+    table.add_column("Last seen")
+    table.add_column("Error")
+    for entry in results:
+        table.add_row(entry['fingerprint'][:12], str(entry['count']), str(entry['files']),
+                      format_seen(entry['last_seen']), error_summary(entry['sample']))
+    console.print(table)
+
+@index.command()
+@click.argument('fingerprint_prefix')
+@click.pass_obj
+def show(log_index, fingerprint_prefix):
+    """Show one error: counts, where it was seen and a sample."""
+    entry = log_index.get(fingerprint_prefix.lower())
+    if entry is None:
+        console.print("[red]No single error matches that fingerprint[/red]")
+        sys.exit(1)
+    
+    console.print(f"[cyan]{entry['fingerprint']}[/cyan]: {entry['count']} times in {entry['files']} files, "
+                  f"first {format_seen(entry['first_seen'])}, last {format_seen(entry['last_seen'])}")
+    for path, line in entry['locations']:
+        console.print(f"  {path}:{line}")
+    console.print(Panel(Text(entry['sample']), title="Sample", border_style="yellow"))
+
+@index.command()
+@click.option('--limit', default=10, show_default=True, help='Number of errors to explain')
+@click.option('--dry-run', is_flag=True, help='List the errors that would be explained')
+@click.option('--api-key', envvar='GEMINI_API_KEY', help='Gemini API key (or set GEMINI_API_KEY env var)')
+@click.option('--shared-cache', envvar='TERMEXPLAIN_SHARED_CACHE', help='Shared cache server as host:port (memcached protocol)')
+@click.option('--workers', default=4, show_default=True, help='Maximum concurrent model calls')
+@click.pass_obj
+def warm(log_index, limit, dry_run, api_key, shared_cache, workers):
+    """Explain and cache the most frequent errors that aren't cached yet."""
+    from termexplain.api import Explainer
+    
+    cache = build_cache(shared_cache)
+    candidates = log_index.warmup_candidates(cache, limit)
+    if not candidates:
+        console.print("[green]✅ Every indexed error is already cached[/green]")
+        return
+    if dry_run:
+        for entry in candidates:
+            console.print(f"[cyan]{entry['fingerprint'][:12]}[/cyan] {entry['count']:>7}x  "
+                          f"{error_summary(entry['sample'])}")
+        return
+    
+    try:
+        # Saved below under the fingerprint only, not also under the exact text
+        explainer = Explainer(api_key, cache=cache, max_workers=workers, save=False)
+    except Exception as e:
+        console.print(f"[red]Error initializing components: {e}[/red]")
+        sys.exit(1)
+    
+    results = explainer.explain_many([entry['sample'] for entry in candidates])
+    failed = [result for result in results if result['explanation'] is None]
+    # The index groups errors by fingerprint; cache by it too, so later
+    # occurrences with other timestamps, ids or paths hit the entry
+    for result in results:
+        if result['explanation'] is not None:
+            cache.save(result['error'], result['explanation'], by_fingerprint=True)
+    cache.flush()
+    console.print(f"[green]✅ Cached {len(results) - len(failed)} explanations[/green]")
+    for result in failed:
+        console.print(f"[red]❌ {error_summary(result['error'], 60)}: {result['failed']}[/red]")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -8,6 +8,15 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 # Path to Homebrew-installed termExplain's Python binary
 VENV_PY="$SCRIPT_DIR/../libexec/bin/python"
 
+# Print shell hooks without starting Python, so shell startup stays fast
+if [ "$1" = "hook" ] && [ -n "$2" ]; then
+    for HOOK in "$SCRIPT_DIR"/../libexec/lib/python*/site-packages/termexplain/shell/hook."$2"; do
+        if [ -f "$HOOK" ]; then
+            exec cat "$HOOK"
+        fi
+    done
+fi
+
 # Check if Python binary exists
 if [ ! -x "$VENV_PY" ]; then
     echo "❌ Error: Python executable not found at $VENV_PY"
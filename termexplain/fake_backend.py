@@ -0,0 +1,192 @@
+"""
+Fake Gemini Backend for termExplain
+
+A local stand-in for genai.GenerativeModel with configurable latency and
+injected slow responses. Pass it to GeminiClient(model=...) to exercise
+hedging, deadlines and load tests without network access or an API key.
+
+To run the CLI itself against the fake (e.g. a service for load tests), pass
+the fake's options first:
+
+    python -m termexplain.fake_backend latency=0.8 serve
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from typing import List, Optional
+
+CANNED_EXPLANATION = """1. **What this error means**
+* {summary}
+
+2. **Why it likely occurred**
+* A fake backend produced this explanation for testing.
+
+3. **How to fix it**
+* Nothing to fix; this response did not come from Gemini.
+"""
+
+class CancelledRequest(Exception):
+    """Raised by the fake backend when a request is cancelled mid-flight."""
+
+class FakeResponse:
+    """Minimal stand-in for a GenerateContentResponse."""
+
+    def __init__(self, text: str, prompt_tokens: int = 0, output_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = type("UsageMetadata", (), {
+            'prompt_token_count': prompt_tokens,
+            'candidates_token_count': output_tokens,
+            'total_token_count': prompt_tokens + output_tokens,
+        })()
+
+class FakeStream:
+    """Minimal stand-in for a streamed GenerateContentResponse."""
+
+    def __init__(self, chunks, delay: float, cancel_event: Optional[threading.Event] = None):
+        self._chunks = chunks
+        self._delay = delay
+        self._cancel_event = cancel_event
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._cancel_event is not None:
+                if self._cancel_event.wait(self._delay):
+                    raise CancelledRequest("Request cancelled")
+            else:
+                time.sleep(self._delay)
+            yield FakeResponse(chunk)
+
+class FakeModel:
+    """Fake generative model with injectable latency."""
+
+    # GeminiClient passes a cancel_event to backends that set this
+    supports_cancel = True
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, slow_probability: float = 0.0,
+                 slow_latency: float = 2.0, fail_probability: float = 0.0, seed: Optional[int] = None,
+                 name: str = "fake"):
+        """
+        Initialize the fake model.
+
+        Args:
+            latency: Base response time in seconds
+            jitter: Uniform random extra latency in seconds
+            slow_probability: Chance that a response takes slow_latency instead
+            slow_latency: Response time of injected slow responses
+            fail_probability: Chance that a request raises an error
+            seed: Random seed for reproducible runs
+            name: Model name reported in responses
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_probability = slow_probability
+        self.slow_latency = slow_latency
+        self.fail_probability = fail_probability
+        self.model_name = name
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "FakeModel":
+        """
+        Create a fake model from a compact option string.
+
+        Args:
+            spec: Comma-separated name=value options, e.g.
+                "latency=0.8,jitter=0.4,slow_probability=0.02"; a bare number
+                is taken as the latency
+
+        Returns:
+            FakeModel
+        """
+        options = {}
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            name, sep, value = part.partition("=")
+            if not sep:
+                name, value = "latency", name
+            if name == "name":
+                options[name] = value
+            elif name == "seed":
+                options[name] = int(value)
+            elif name in ("latency", "jitter", "slow_probability", "slow_latency", "fail_probability"):
+                options[name] = float(value)
+            else:
+                raise ValueError(f"Unknown fake backend option: {name}")
+        return cls(**options)
+
+    def generate_content(self, contents, generation_config=None, safety_settings=None, stream=False,
+                         request_options=None, cancel_event: Optional[threading.Event] = None, **kwargs):
+        """
+        Produce a canned explanation after the configured delay.
+
+        Args:
+            contents: Prompt text
+            cancel_event: Set by the caller to abandon the request early
+
+        Returns:
+            FakeResponse
+        """
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < self.slow_probability
+            fail = self._random.random() < self.fail_probability
+            delay = (self.slow_latency if slow else self.latency) + self._random.uniform(0, self.jitter)
+
+        prompt = contents if isinstance(contents, str) else str(contents)
+        summary = prompt.rsplit("Error:", 1)[-1].strip().splitlines()[-1:] or ["Unknown error"]
+        text = CANNED_EXPLANATION.format(summary=summary[0][:120])
+
+        if stream:
+            # Spread the latency over a few chunks, one per line
+            chunks = [line + "\n" for line in text.splitlines()]
+            return FakeStream(chunks, delay / len(chunks), cancel_event)
+
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake request timed out after {timeout}s")
+
+        if cancel_event is not None:
+            if cancel_event.wait(delay):
+                with self._lock:
+                    self.cancelled += 1
+                raise CancelledRequest("Request cancelled")
+        else:
+            time.sleep(delay)
+
+        if fail:
+            raise RuntimeError("Injected backend failure")
+
+        with self._lock:
+            self.completed += 1
+        return FakeResponse(text, prompt_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+
+def run_cli(spec: str, args: List[str]):
+    """
+    Run the termExplain CLI with every Gemini model replaced by a FakeModel.
+
+    Only this entry point swaps the backend; the regular `explain` command
+    always talks to Gemini, so fake answers never reach a real cache by accident.
+
+    Args:
+        spec: FakeModel options (see FakeModel.from_spec)
+        args: CLI arguments, e.g. ["explain", "--save", "KeyError: 'x'"]
+    """
+    import google.generativeai as genai
+    from termexplain import cli
+
+    FakeModel.from_spec(spec)  # Fail early on a bad spec
+    genai.GenerativeModel = lambda model_name, **kwargs: FakeModel.from_spec(f"{spec},name={model_name}")
+    os.environ.setdefault('GEMINI_API_KEY', "fake")
+    cli.main(args=args, prog_name="explain")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python -m termexplain.fake_backend FAKE_BACKEND_OPTIONS [EXPLAIN ARGS...]")
+    run_cli(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,127 @@
+"""
+Offline Fallback Explanations for termExplain
+
+Canned explanations used when Gemini can't answer before a deadline. They
+follow the same three-section format as model answers, so the formatter
+renders them the same way. Specific patterns are checked first, then the
+broad error category from PromptBuilder.
+"""
+
+import re
+from typing import Optional
+
+_TEMPLATE = """1. **What this error means**
+{what}
+
+2. **Why it likely occurred**
+{why}
+
+3. **How to fix it**
+{how}
+"""
+
+# (pattern, what, why, how), checked in order against the error text
+PATTERN_FALLBACKS = [
+    (
+        r"ModuleNotFoundError|No module named|ImportError",
+        "* Python could not import a module the code depends on.",
+        "* The package is not installed in the active environment, or a virtualenv is not activated.\n"
+        "* The module name is misspelled, or a local file shadows it.",
+        "* Install it with `pip install <package>` in the environment you run the code with.\n"
+        "* Check `which python` and activate the right virtualenv.",
+    ),
+    (
+        r"Cannot find module",
+        "* Node.js could not resolve a required module.",
+        "* Dependencies are not installed, or the import path is wrong.",
+        "* Run `npm install` in the project directory.\n"
+        "* Check the relative path and file extension of the import.",
+    ),
+    (
+        r"command not found",
+        "* The shell could not find an executable with that name.",
+        "* The program is not installed, or its directory is not on `PATH`.\n"
+        "* The command name is misspelled.",
+        "* Install the program with your package manager.\n"
+        "* Check `echo $PATH` and the spelling of the command.",
+    ),
+    (
+        r"permission denied|EACCES|PermissionError",
+        "* The operating system refused access to a file, directory or socket.",
+        "* The current user lacks read, write or execute permission.\n"
+        "* A script is missing its executable bit.",
+        "* Inspect permissions with `ls -l`.\n"
+        "* Use `chmod +x` for scripts, or fix ownership with `chown`; avoid running everything as root.",
+    ),
+    (
+        r"port already in use|address already in use|EADDRINUSE",
+        "* Another process is already listening on the requested port.",
+        "* A previous instance is still running, or another service uses the same port.",
+        "* Find the process with `lsof -i :<port>` and stop it.\n"
+        "* Or configure a different port.",
+    ),
+    (
+        r"No such file or directory|FileNotFoundError|ENOENT",
+        "* A file or directory that the command needs does not exist at the given path.",
+        "* The path is wrong, or relative to a different working directory.",
+        "* Check the path with `ls` and run the command from the expected directory.",
+    ),
+    (
+        r"no space left on device",
+        "* The filesystem is full.",
+        "* Logs, caches, build artifacts or container images have filled the disk.",
+        "* Check usage with `df -h` and `du -sh *`.\n"
+        "* Remove unused files; for Docker, run `docker system prune`.",
+    ),
+]
+
+# Used when no specific pattern matches, keyed by PromptBuilder error type
+CATEGORY_FALLBACKS = {
+    'python': (
+        "* The Python interpreter raised an exception; its type is on the last line of the traceback.",
+        "* The innermost frame in your own code is usually where the problem starts.",
+        "* Read the exception message and the line it points to.\n"
+        "* Re-run with the same input after fixing it.",
+    ),
+    'bash': (
+        "* A shell command failed.",
+        "* Common causes are a missing program, a wrong path or missing permissions.",
+        "* Re-run the command with the exact arguments and check each path it uses.",
+    ),
+    'docker': (
+        "* Docker could not complete the requested operation.",
+        "* The image, container or host resource named in the message is missing or busy.",
+        "* Check `docker ps -a` and `docker images`, and the Docker daemon logs.",
+    ),
+    'node': (
+        "* Node.js raised an error while running the script.",
+        "* The stack trace points to the failing module and line.",
+        "* Start from the first stack frame in your own code.\n"
+        "* Make sure dependencies are installed with `npm install`.",
+    ),
+}
+
+GENERIC_FALLBACK = (
+    "* The command or program reported an error.",
+    "* The exact cause could not be determined without the AI explanation.",
+    "* Read the last lines of the error output, which usually name the failing step.\n"
+    "* Try again later for a full explanation.",
+)
+
+def fallback_explanation(error_text: str, error_type: Optional[str] = None) -> str:
+    """
+    Build an offline explanation for an error.
+
+    Args:
+        error_text: The error text
+        error_type: Category from PromptBuilder.detect_error_type (optional)
+
+    Returns:
+        Explanation in the usual three-section format
+    """
+    for pattern, what, why, how in PATTERN_FALLBACKS:
+        if re.search(pattern, error_text, re.IGNORECASE):
+            return _TEMPLATE.format(what=what, why=why, how=how)
+
+    what, why, how = CATEGORY_FALLBACKS.get(error_type, GENERIC_FALLBACK)
+    return _TEMPLATE.format(what=what, why=why, how=how)
@@ -4,48 +4,199 @@ Gemini API Client for termExplain
 Handles communication with Google's Gemini AI service to get error explanations.
 """
 
+import json
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import google.generativeai as genai
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 import logging
 
+from termexplain.routing import DEFAULT_MODEL, Route, RouteStats
+from termexplain.utils.filelock import file_lock
+
+class LatencyTracker:
+    """Keeps recent request latencies to derive percentiles."""
+    
+    def __init__(self, window: int = 200, history_file: Optional[str] = None):
+        """
+        Initialize the tracker.
+        
+        Args:
+            window: Number of recent latencies kept
+            history_file: JSON file that persists latencies between runs (optional)
+        """
+        self.history_file = history_file
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        
+        if history_file:
+            self._samples.extend(self._read_history())
+    
+    def record(self, seconds: float):
+        """
+        Record one latency.
+        
+        With a history file, the sample is added to what is on disk, so
+        concurrent processes don't overwrite each other's samples.
+        
+        Args:
+            seconds: Request latency in seconds
+        """
+        if not self.history_file:
+            with self._lock:
+                self._samples.append(seconds)
+            return
+        
+        with self._lock, file_lock(self.history_file):
+            samples = deque(self._read_history(), maxlen=self._samples.maxlen)
+            samples.append(seconds)
+            self._samples = samples
+            try:
+                tmp_path = f"{self.history_file}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump([round(x, 4) for x in samples], f)
+                os.replace(tmp_path, self.history_file)
+            except IOError:
+                pass
+    
+    def _read_history(self) -> List[float]:
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                return [float(x) for x in json.load(f)]
+        except (IOError, ValueError, TypeError):
+            return []
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Get a percentile of recent latencies.
+        
+        Args:
+            fraction: Percentile as a fraction (0.95 for p95)
+            
+        Returns:
+            Latency in seconds, or None without samples
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+
+class HedgingPolicy:
+    """When to send a duplicate request and how long to wait overall."""
+    
+    def __init__(self, percentile: float = 0.95, min_delay: float = 0.2, max_delay: float = 10.0,
+                 default_delay: float = 2.0, min_samples: int = 10, deadline: float = 30.0):
+        """
+        Initialize the policy.
+        
+        Args:
+            percentile: Hedge once a request is slower than this fraction of recent requests
+            min_delay: Never hedge sooner than this many seconds
+            max_delay: Always hedge after this many seconds
+            default_delay: Hedge delay until min_samples latencies are known
+            min_samples: Latencies needed before the percentile is trusted
+            deadline: Hard limit in seconds for the whole request, hedge included
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.deadline = deadline
+    
+    def hedge_delay(self, tracker: LatencyTracker) -> float:
+        """
+        Get the delay before hedging.
+        
+        Args:
+            tracker: Recent latencies
+            
+        Returns:
+            Seconds to wait before sending the duplicate
+        """
+        observed = tracker.percentile(self.percentile) if len(tracker) >= self.min_samples else None
+        delay = self.default_delay if observed is None else observed
+        return min(self.max_delay, max(self.min_delay, delay))
+
 class GeminiClient:
     """Client for interacting with Google's Gemini AI API."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model=None, hedging: Optional[HedgingPolicy] = None,
+                 alternate_model=None, latency_history_file: Optional[str] = None,
+                 route_stats_file: Optional[str] = None):
         """
         Initialize the Gemini client.
         
         Args:
             api_key: Gemini API key. If not provided, will try to get from environment.
+            model: Model object to use instead of Gemini (e.g. FakeModel for tests)
+            hedging: Send a duplicate request when the first is slow (default: off)
+            alternate_model: Backend for hedged requests, or a Gemini model name
+                (default: the primary model)
+            latency_history_file: Persist recent latencies here so hedging works
+                across separate CLI runs; each route keeps its own file next to it
+            route_stats_file: Persist per-route latency and token totals here
         """
+        # Set up logging - suppress INFO messages
+        logging.basicConfig(level=logging.WARNING)
+        self.logger = logging.getLogger(__name__)
+        
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         
-        if not self.api_key:
-            raise ValueError(
-                "Gemini API key not found. Please set GEMINI_API_KEY environment variable "
-                "or provide it via --api-key option."
-            )
+        # An injected model serves every route; otherwise routes pick Gemini models by name
+        self._fixed_model = model is not None
+        self._models: Dict[str, object] = {}
         
-        # Configure the Gemini API
-        genai.configure(api_key=self.api_key)
+        if model is not None:
+            self.model = model
+        else:
+            if not self.api_key:
+                raise ValueError(
+                    "Gemini API key not found. Please set GEMINI_API_KEY environment variable "
+                    "or provide it via --api-key option."
+                )
+            
+            # Configure the Gemini API
+            genai.configure(api_key=self.api_key)
+            
+            # Initialize the model (using Gemini Pro 1.5)
+            try:
+                self.model = genai.GenerativeModel(DEFAULT_MODEL)
+            except Exception as e:
+                raise ValueError(f"Failed to initialize Gemini model: {e}")
+            self._models[DEFAULT_MODEL] = self.model
         
-        # Initialize the model (using Gemini Pro 1.5)
-        try:
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Gemini model: {e}")
+        if isinstance(alternate_model, str):
+            alternate_model = genai.GenerativeModel(alternate_model)
+        self.alternate_model = alternate_model or self.model
         
-        # Set up logging - suppress INFO messages
-        logging.basicConfig(level=logging.WARNING)
-        self.logger = logging.getLogger(__name__)
+        self.hedging = hedging
+        # Hedge thresholds are per route: a 200-token flash-lite answer and a
+        # 1024-token one for a deep traceback take very different times
+        self.latency_history_file = latency_history_file
+        self.latency = LatencyTracker(history_file=latency_history_file)
+        self._route_latency: Dict[str, LatencyTracker] = {}
+        self.route_stats = RouteStats(route_stats_file)
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats_lock = threading.Lock()
     
-    def get_explanation(self, prompt: str) -> str:
+    def get_explanation(self, prompt: str, route: Optional[Route] = None) -> str:
         """
         Get an explanation from Gemini AI.
         
         Args:
             prompt: The formatted prompt to send to Gemini
+            route: Model and output budget to use (default: gemini-2.0-flash, 500 tokens)
             
         Returns:
             The AI-generated explanation
@@ -56,34 +207,12 @@ class GeminiClient:
         try:
             self.logger.info("Sending request to Gemini API")
             
-            # Generate content with safety settings
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,  # Lower temperature for more focused responses
-                    top_p=0.8,
-                    top_k=40,
-                    max_output_tokens=500,  # Limit response length for shorter answers
-                ),
-                safety_settings=[
-                    {
-                        "category": "HARM_CATEGORY_HARASSMENT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_HATE_SPEECH",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    },
-                    {
-                        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-                    }
-                ]
-            )
+            if self.hedging is not None:
+                return self._get_hedged(prompt, route)
+            
+            start = time.monotonic()
+            response = self._generate(self._backend(route), prompt, route=route)
+            self._record(route, time.monotonic() - start, response)
             
             if response.text:
                 self.logger.info("Successfully received response from Gemini")
@@ -95,6 +224,242 @@ class GeminiClient:
             self.logger.error(f"Error calling Gemini API: {e}")
             raise Exception(f"Failed to get explanation from Gemini: {e}")
     
+    def stream_explanation(self, prompt: str, on_text: Callable[[str], None], route: Optional[Route] = None) -> str:
+        """
+        Get an explanation, passing each streamed chunk to a callback as it arrives.
+        
+        With hedging configured, the request is hedged instead of streamed
+        (a hedge only helps before the first chunk arrives), and the whole
+        explanation is passed to on_text at once.
+        
+        Args:
+            prompt: The formatted prompt to send to Gemini
+            on_text: Called with each chunk of text
+            route: Model and output budget to use (optional)
+            
+        Returns:
+            The complete explanation
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        if self.hedging is not None:
+            explanation = self.get_explanation(prompt, route)
+            on_text(explanation)
+            return explanation
+        
+        try:
+            start = time.monotonic()
+            parts = []
+            chunk = None
+            for chunk in self._generate(self._backend(route), prompt, stream=True, route=route):
+                text = chunk.text or ""
+                parts.append(text)
+                on_text(text)
+            # Usage totals arrive with the last chunk
+            self._record(route, time.monotonic() - start, chunk)
+            
+            explanation = "".join(parts).strip()
+            if not explanation:
+                raise Exception("Empty response from Gemini")
+            return explanation
+        except Exception as e:
+            self.logger.error(f"Error calling Gemini API: {e}")
+            raise Exception(f"Failed to get explanation from Gemini: {e}")
+    
+    def _get_hedged(self, prompt: str, route: Optional[Route] = None) -> str:
+        """
+        Send the request, plus a duplicate if it is slower than usual; first answer wins.
+        
+        Only the primary attempt's latency feeds the hedge threshold; counting
+        a winning hedge from the start of the request would pull the
+        percentile down and make hedging ever more frequent. Backends that
+        take a cancel_event (FakeModel) stop a losing attempt early. The
+        Gemini SDK has no cancellation, so a losing Gemini call is abandoned:
+        it runs to completion on its worker thread and its tokens are billed.
+        
+        Args:
+            prompt: The formatted prompt
+            route: Model and output budget to use (optional)
+            
+        Returns:
+            The AI-generated explanation
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="termexplain-hedge")
+        
+        start = time.monotonic()
+        deadline = start + self.hedging.deadline
+        primary = self._backend(route)
+        # Hedges go to the alternate model only if one was configured
+        alternate = primary if self.alternate_model is self.model else self.alternate_model
+        cancel_events = [threading.Event()]
+        pending = {
+            self._executor.submit(self._attempt, primary, prompt, cancel_events[0], deadline, route, True): 0
+        }
+        hedge_at = start + self.hedging.hedge_delay(self.latency_for(route))
+        errors: List[Exception] = []
+        
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise TimeoutError(f"No response within the {self.hedging.deadline:g}s deadline")
+                
+                hedge_pending = len(cancel_events) == 1
+                if hedge_pending and (now >= hedge_at or not pending):
+                    # Slow (or failed) first attempt: race a duplicate against it
+                    cancel_events.append(threading.Event())
+                    with self._stats_lock:
+                        self.hedges_sent += 1
+                    self.logger.info("Sending hedged request")
+                    future = self._executor.submit(
+                        self._attempt, alternate, prompt, cancel_events[1], deadline, route
+                    )
+                    pending[future] = 1
+                    continue
+                if not pending:
+                    break
+                
+                timeout = (min(deadline, hedge_at) if hedge_pending else deadline) - now
+                done, _ = wait(list(pending), timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    attempt = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if attempt == 1:
+                        with self._stats_lock:
+                            self.hedge_wins += 1
+                    # The primary attempt records its own latency (see _attempt)
+                    self._record(route, time.monotonic() - start, response, latency=False)
+                    return response.text.strip()
+            
+            raise errors[-1] if errors else Exception("Empty response from Gemini")
+        finally:
+            # Cancel the losers: queued attempts never start, running ones are told to stop
+            for future in pending:
+                future.cancel()
+            for event in cancel_events:
+                event.set()
+            if pending:
+                with self._stats_lock:
+                    self.cancelled += len(pending)
+    
+    def _attempt(self, backend, prompt: str, cancel_event: threading.Event, deadline: float,
+                 route: Optional[Route] = None, primary: bool = False):
+        """One attempt of a hedged request; returns the non-empty response."""
+        start = time.monotonic()
+        try:
+            response = self._generate(backend, prompt, cancel_event,
+                                      timeout=max(0.1, deadline - time.monotonic()), route=route)
+        except Exception:
+            if primary and cancel_event.is_set():
+                # Cancelled because the hedge won: it took at least this long
+                self.latency_for(route).record(time.monotonic() - start)
+            raise
+        if primary:
+            self.latency_for(route).record(time.monotonic() - start)
+        if not response.text:
+            raise Exception("Empty response from Gemini")
+        return response
+    
+    def latency_for(self, route: Optional[Route]) -> LatencyTracker:
+        """
+        Get the recent latencies of a route.
+        
+        Args:
+            route: The route, or None for unrouted requests
+            
+        Returns:
+            LatencyTracker for the route
+        """
+        if route is None:
+            return self.latency
+        with self._stats_lock:
+            tracker = self._route_latency.get(route.name)
+            if tracker is None:
+                history_file = None
+                if self.latency_history_file:
+                    root, ext = os.path.splitext(self.latency_history_file)
+                    history_file = f"{root}.{route.name}{ext}"
+                tracker = self._route_latency[route.name] = LatencyTracker(history_file=history_file)
+            return tracker
+    
+    def _backend(self, route: Optional[Route]):
+        """Get the model object for a route."""
+        if route is None or self._fixed_model:
+            return self.model
+        with self._stats_lock:
+            if route.model not in self._models:
+                self._models[route.model] = genai.GenerativeModel(route.model)
+            return self._models[route.model]
+    
+    def _record(self, route: Optional[Route], seconds: float, response, latency: bool = True):
+        """Record latency for the route's hedge threshold and, for routed calls, token usage."""
+        if latency:
+            self.latency_for(route).record(seconds)
+        if route is not None:
+            self.route_stats.record(route, seconds, getattr(response, 'usage_metadata', None))
+    
+    def _generate(self, backend, prompt: str, cancel_event: Optional[threading.Event] = None,
+                  timeout: Optional[float] = None, stream: bool = False, route: Optional[Route] = None):
+        """
+        Call a backend's generate_content with the standard settings.
+        
+        Args:
+            backend: Model object to call
+            prompt: The formatted prompt
+            cancel_event: Lets backends that support it abandon the request early
+            timeout: Per-request timeout in seconds
+            stream: Return an iterator of partial responses
+            route: Supplies the output token limit (default: 500)
+            
+        Returns:
+            The backend's response
+        """
+        kwargs = {}
+        if stream:
+            kwargs['stream'] = True
+        if timeout is not None:
+            kwargs['request_options'] = {'timeout': timeout}
+        if cancel_event is not None and getattr(backend, 'supports_cancel', False):
+            kwargs['cancel_event'] = cancel_event
+        
+        # Generate content with safety settings
+        return backend.generate_content(
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0.3,  # Lower temperature for more focused responses
+                top_p=0.8,
+                top_k=40,
+                # Limit response length for shorter answers
+                max_output_tokens=route.max_output_tokens if route is not None else 500,
+            ),
+            safety_settings=[
+                {
+                    "category": "HARM_CATEGORY_HARASSMENT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_HATE_SPEECH",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                },
+                {
+                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+                    "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+                }
+            ],
+            **kwargs
+        )
+    
     def test_connection(self) -> bool:
         """
         Test the connection to Gemini API.
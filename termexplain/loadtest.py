@@ -0,0 +1,382 @@
+"""
+Load Testing for termExplain
+
+Replays a corpus of error texts against termExplain at a fixed arrival rate
+and concurrency, with the fake model backend standing in for Gemini, and
+reports throughput, latency percentiles, cache hit ratio, upstream calls and
+single-flight contention.
+
+Three targets are supported:
+    library  Explainer objects in this process (one shared cache)
+    cli      one `termExplain` process per request, like agents shelling out
+    service  an `explain serve` instance (started here unless --url is given)
+
+Usage:
+    python -m termexplain.loadtest --mode cli --concurrency 200 --requests 1000
+    python -m termexplain.loadtest --mode library --corpus errors.jsonl --rate 50
+
+With --rate, requests are started on a fixed schedule and latency is measured
+from the scheduled start, so time spent queued behind slow requests counts.
+"""
+
+import http.client
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from termexplain.api import Explainer
+from termexplain.fake_backend import FakeModel
+from termexplain.gemini_client import GeminiClient
+from termexplain.prompt_builder import PromptBuilder
+from termexplain.server import ExplainService, run_server
+from termexplain.utils.cache import ErrorCache
+from termexplain.utils.follow import ErrorRecordDetector
+from termexplain.utils.formatter import OutputFormatter
+from termexplain.utils.log_index import iter_log_lines
+from termexplain.utils.tiered_cache import RemoteCache, TieredCache
+
+# Roughly what a Gemini call looks like from a laptop: ~1s with a slow tail
+DEFAULT_FAKE_BACKEND = "latency=0.6,jitter=0.6,slow_probability=0.03,slow_latency=4"
+
+DEFAULT_CORPUS = [
+    "ModuleNotFoundError: No module named 'requests'",
+    "ModuleNotFoundError: No module named 'numpy'",
+    "bash: kubectl: command not found",
+    "Permission denied (publickey).",
+    "Error: listen EADDRINUSE: address already in use :::3000",
+    "Error: Cannot find module 'express'",
+    "TypeError: unsupported operand type(s) for +: 'int' and 'str'",
+    "docker: Error response from daemon: pull access denied for myapp, repository does not exist",
+    "fatal: not a git repository (or any of the parent directories): .git",
+    "OSError: [Errno 28] No space left on device",
+    "KeyError: 'DATABASE_URL'",
+    "SyntaxError: invalid syntax",
+]
+
+console = Console()
+
+def load_corpus(path: str) -> List[str]:
+    """
+    Load error texts to replay.
+
+    Args:
+        path: JSON Lines file (objects with "error" or "error_text", as written
+            by `termExplain cache export`), or a plain or gzip log file whose
+            error records are extracted
+
+    Returns:
+        Error texts in file order
+    """
+    if path.endswith(".jsonl"):
+        errors = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    text = entry.get('error') or entry.get('error_text')
+                    if text:
+                        errors.append(text)
+        return errors
+
+    detector = ErrorRecordDetector()
+    errors = []
+    for line in iter_log_lines(path):
+        errors.extend(detector.feed(line, now=0.0))
+    errors.extend(detector.flush_idle(now=float("inf")))
+    return errors
+
+class LibraryTarget:
+    """Explains through an in-process Explainer."""
+
+    name = "library"
+
+    def __init__(self, fake_backend: str, cache_dir: str, shared_cache: Optional[str], concurrency: int):
+        self.model = FakeModel.from_spec(fake_backend)
+        cache = TieredCache(ErrorCache(cache_dir), RemoteCache(shared_cache) if shared_cache else None)
+        self.explainer = Explainer(gemini_client=GeminiClient(model=self.model), cache=cache,
+                                   max_workers=concurrency)
+
+    def request(self, error_text: str) -> bool:
+        """Explain one error; returns whether it was a cache hit."""
+        result = self.explainer.explain(error_text)
+        if result['explanation'] is None:
+            raise RuntimeError(result['failed'])
+        return result['cached']
+
+    def stats(self) -> Dict[str, Any]:
+        single_flight = self.explainer.single_flight
+        return {
+            'upstream_calls': self.model.calls,
+            'coalesced': single_flight.shared,
+            'lock_wait_seconds': round(single_flight.wait_seconds, 3),
+        }
+
+    def close(self):
+        self.explainer.cache.flush()
+
+class CliTarget:
+    """Runs one termExplain process per request against a shared cache directory."""
+
+    name = "cli"
+
+    def __init__(self, fake_backend: str, cache_dir: str, shared_cache: Optional[str]):
+        self.fake_backend = fake_backend
+        self.env = dict(os.environ, TERMEXPLAIN_CACHE_DIR=cache_dir)
+        if shared_cache:
+            self.env['TERMEXPLAIN_SHARED_CACHE'] = shared_cache
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def request(self, error_text: str) -> bool:
+        """Run `termExplain --save ERROR` on the fake backend; returns whether it was a cache hit."""
+        proc = subprocess.run(
+            [sys.executable, "-m", "termexplain.fake_backend", self.fake_backend, "explain", "--save", error_text],
+            env=self.env, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            output = (proc.stdout + proc.stderr).strip().splitlines()
+            raise RuntimeError(output[-1] if output else f"exit status {proc.returncode}")
+        if "Found cached explanation" in proc.stdout:
+            return True
+        with self._lock:
+            self.misses += 1
+            if "Reused explanation" in proc.stdout:
+                self.coalesced += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        # Each process has its own counters, so these come from the output
+        return {
+            'upstream_calls': self.misses - self.coalesced,
+            'coalesced': self.coalesced,
+            'lock_wait_seconds': None,
+        }
+
+    def close(self):
+        pass
+
+class ServiceTarget:
+    """Posts to an explain service, starting one in this process unless a URL is given."""
+
+    name = "service"
+
+    def __init__(self, fake_backend: str, cache_dir: str, shared_cache: Optional[str], workers: int,
+                 url: Optional[str] = None):
+        if url is None:
+            cache = TieredCache(ErrorCache(cache_dir), RemoteCache(shared_cache) if shared_cache else None)
+            service = ExplainService(GeminiClient(model=FakeModel.from_spec(fake_backend)), PromptBuilder(),
+                                     OutputFormatter(False), cache, max_upstream=workers)
+            ready = threading.Event()
+            address = []
+
+            def on_ready(bound):
+                address.extend(bound)
+                ready.set()
+
+            threading.Thread(target=run_server, args=(service, "127.0.0.1", 0, on_ready),
+                             name="termexplain-loadtest-service", daemon=True).start()
+            if not ready.wait(10):
+                raise RuntimeError("Explain service did not start")
+            url = f"http://{address[0]}:{address[1]}"
+
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self._local = threading.local()
+        # The service may already have served traffic; report only this run
+        self._baseline = self._metrics()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if getattr(self._local, 'conn', None) is None:
+            self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        return self._local.conn
+
+    def _call(self, method: str, path: str, body: Optional[bytes] = None) -> Dict[str, Any]:
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            payload = json.loads(response.read())
+        except (OSError, http.client.HTTPException):
+            self._local.conn = None
+            conn.close()
+            raise
+        if response.status != 200:
+            raise RuntimeError(payload.get('error', f"HTTP {response.status}"))
+        return payload
+
+    def _metrics(self) -> Dict[str, Any]:
+        return self._call("GET", "/metrics")
+
+    def request(self, error_text: str) -> bool:
+        """POST one error to /explain; returns whether it was a cache hit."""
+        return self._call("POST", "/explain", json.dumps({'error': error_text}).encode("utf-8"))['cached']
+
+    def stats(self) -> Dict[str, Any]:
+        metrics = self._metrics()
+        return {
+            'upstream_calls': metrics['upstream_calls'] - self._baseline['upstream_calls'],
+            'coalesced': metrics['coalesced_requests'] - self._baseline['coalesced_requests'],
+            'lock_wait_seconds': None,
+        }
+
+    def close(self):
+        pass
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def run_load(target, corpus: List[str], requests: int, concurrency: int, rate: float = 0.0,
+             shuffle: bool = False, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Replay a corpus against a target.
+
+    Args:
+        target: LibraryTarget, CliTarget or ServiceTarget
+        corpus: Error texts, replayed in order and repeated as needed
+        requests: Total number of requests
+        concurrency: Number of concurrent clients
+        rate: Requests started per second (0: as fast as the clients allow)
+        shuffle: Replay the corpus in random order
+        seed: Random seed for shuffle
+
+    Returns:
+        Report with throughput, latency percentiles, hit ratio, upstream calls
+        and contention counters
+    """
+    order = [corpus[i % len(corpus)] for i in range(requests)]
+    if shuffle:
+        random.Random(seed).shuffle(order)
+
+    work: "queue.Queue[Optional[tuple]]" = queue.Queue()
+    latencies: List[float] = []
+    outcomes = {'hits': 0, 'misses': 0, 'failures': 0}
+    failures: List[str] = []
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            error_text, scheduled = item
+            started = scheduled if scheduled is not None else time.monotonic()
+            delay = started - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                hit = target.request(error_text)
+                outcome = 'hits' if hit else 'misses'
+            except Exception as e:
+                outcome = 'failures'
+                with lock:
+                    if len(failures) < 5:
+                        failures.append(str(e))
+            elapsed = time.monotonic() - started
+            with lock:
+                outcomes[outcome] += 1
+                if outcome != 'failures':
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, name=f"termexplain-loadtest-{i}", daemon=True)
+               for i in range(concurrency)]
+    start = time.monotonic()
+    for i, error_text in enumerate(order):
+        work.put((error_text, start + i / rate if rate else None))
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - start
+
+    latencies.sort()
+    completed = outcomes['hits'] + outcomes['misses']
+    return {
+        'mode': target.name,
+        'requests': requests,
+        'concurrency': concurrency,
+        'rate': rate or None,
+        'duration_seconds': round(duration, 3),
+        'throughput_rps': round(completed / duration, 2) if duration else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        **outcomes,
+        'hit_ratio': round(outcomes['hits'] / completed, 4) if completed else 0.0,
+        **target.stats(),
+        'failure_samples': failures,
+    }
+
+@click.command()
+@click.option('--mode', type=click.Choice(['library', 'cli', 'service']), default='library', show_default=True,
+              help='What to load')
+@click.option('--corpus', 'corpus_path', type=click.Path(exists=True),
+              help='Errors to replay: JSON Lines (cache export) or a log file (default: built-in samples)')
+@click.option('--requests', 'total', type=int, help='Total requests (default: corpus size x 5)')
+@click.option('--concurrency', default=20, show_default=True, help='Concurrent clients')
+@click.option('--rate', default=0.0, show_default=True, help='Requests started per second (0: unthrottled)')
+@click.option('--shuffle', is_flag=True, help='Replay the corpus in random order')
+@click.option('--seed', type=int, help='Random seed for --shuffle')
+@click.option('--fake-backend', envvar='TERMEXPLAIN_FAKE_BACKEND', default=DEFAULT_FAKE_BACKEND, show_default=True,
+              help='Fake model options (see FakeModel.from_spec)')
+@click.option('--cache-dir', help='Cache directory to use (default: a fresh temporary directory)')
+@click.option('--shared-cache', help='Shared cache server as host:port')
+@click.option('--url', help='With --mode service: load a running service instead of starting one')
+@click.option('--workers', default=4, show_default=True, help='With --mode service: maximum concurrent model calls')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON')
+def main(mode, corpus_path, total, concurrency, rate, shuffle, seed, fake_backend, cache_dir, shared_cache, url,
+         workers, as_json):
+    """Replay error texts against termExplain and report latency and cache behaviour."""
+    corpus = load_corpus(corpus_path) if corpus_path else DEFAULT_CORPUS
+    if not corpus:
+        console.print("[red]The corpus contains no errors[/red]")
+        sys.exit(1)
+    cache_dir = cache_dir or tempfile.mkdtemp(prefix="termexplain-loadtest-")
+
+    if mode == 'library':
+        target = LibraryTarget(fake_backend, cache_dir, shared_cache, concurrency)
+    elif mode == 'cli':
+        target = CliTarget(fake_backend, cache_dir, shared_cache)
+    else:
+        target = ServiceTarget(fake_backend, cache_dir, shared_cache, workers, url)
+
+    try:
+        report = run_load(target, corpus, total or len(corpus) * 5, concurrency, rate, shuffle, seed)
+    finally:
+        target.close()
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+
+    table = Table(title=f"termExplain load test ({mode}, cache: {cache_dir})")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="green")
+    for key, value in report.items():
+        if key != 'failure_samples' and value is not None:
+            table.add_row(key.replace('_', ' '), str(value))
+    console.print(table)
+    for failure in report['failure_samples']:
+        console.print(f"[red]❌ {failure}[/red]")
+
+if __name__ == '__main__':
+    main()
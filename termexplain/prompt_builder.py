@@ -7,6 +7,11 @@ Builds structured prompts for Gemini AI to explain terminal errors.
 import re
 from typing import Dict, List, Optional
 
+from termexplain.routing import Route, Router
+from termexplain.utils.traceback_parser import (
+    SourceLineCache, build_source_context, parse_frames, trim_error_output
+)
+
 class PromptBuilder:
     """Builds structured prompts for error explanation."""
     
@@ -49,13 +54,39 @@ class PromptBuilder:
                 r'EACCES'
             ]
         }
+        
+        # Shared across prompts so each source file is read once
+        self.line_cache = SourceLineCache()
+        
+        # Picks model, output budget and template by error complexity
+        self.router = Router()
     
-    def build_prompt(self, error_text: str) -> str:
+    def route(self, error_text: str, prompt: Optional[str] = None) -> Route:
+        """
+        Pick the model route for an error.
+        
+        Args:
+            error_text: The error text
+            prompt: Prepared prompt that will be sent instead of build_prompt's
+                (e.g. a debug prompt with source context); it is scored in
+                place of the error and only full-template routes are considered
+            
+        Returns:
+            Route with the model, output token limit and prompt template to use
+        """
+        error_type = self._detect_error_type(error_text)
+        if prompt is not None:
+            return self.router.route(prompt, error_type, template='full')
+        return self.router.route(error_text, error_type)
+    
+    def build_prompt(self, error_text: str, route: Optional[Route] = None) -> str:
         """
         Build a structured prompt for error explanation.
         
         Args:
             error_text: The error text to explain
+            route: Route from route(); its template picks the short or full
+                instructions (default: full)
             
         Returns:
             Formatted prompt string
@@ -64,7 +95,10 @@ class PromptBuilder:
         error_type = self._detect_error_type(error_text)
         
         # Build the base prompt
-        prompt = self._get_base_prompt()
+        if route is not None and route.template == 'short':
+            prompt = self._get_short_prompt()
+        else:
+            prompt = self._get_base_prompt()
         
         # Add context based on error type
         if error_type:
@@ -96,6 +130,27 @@ Format your response using markdown-style headers and bullet points where helpfu
 Use clean, readable language for a developer seeing this for the first time.
 """
     
+    def _get_short_prompt(self) -> str:
+        """Get the prompt template for simple, one-line errors."""
+        return """Explain this terminal error briefly, using these three headers with one or two bullet points each:
+
+1. **What this error means**
+2. **Why it likely occurred**
+3. **How to fix it** - include the command to run if there is one
+"""
+    
+    def detect_error_type(self, error_text: str) -> Optional[str]:
+        """
+        Detect the broad category of an error (python, bash, docker, node).
+        
+        Args:
+            error_text: The error text to analyze
+            
+        Returns:
+            Detected error type or None
+        """
+        return self._detect_error_type(error_text)
+    
     def _detect_error_type(self, error_text: str) -> Optional[str]:
         """
         Detect the type of error based on patterns.
@@ -115,13 +170,14 @@ Use clean, readable language for a developer seeing this for the first time.
         
         return None
     
-    def build_debug_prompt(self, error_text: str, context: Dict = None) -> str:
+    def build_debug_prompt(self, error_text: str, context: Dict = None, source_context: Optional[str] = None) -> str:
         """
         Build a more detailed prompt for complex debugging scenarios.
         
         Args:
             error_text: The error text
             context: Additional context (OS, language version, etc.)
+            source_context: Source excerpts around the failing lines
             
         Returns:
             Enhanced prompt string
@@ -133,6 +189,40 @@ Use clean, readable language for a developer seeing this for the first time.
             context_str = "\n".join([f"- {k}: {v}" for k, v in context.items()])
             prompt += f"\n\nAdditional Context:\n{context_str}"
         
+        if source_context:
+            prompt += f"\n\nRelevant source (> marks the failing line):\n{source_context}"
+        
         prompt += f"\n\nError: {error_text}"
         
-        return prompt 
\ No newline at end of file
+        return prompt
+    
+    def build_traceback_prompt(self, error_text: str, base_dir: Optional[str] = None,
+                               error_budget: int = 6000, source_budget: int = 2000) -> str:
+        """
+        Build a prompt from program output, adding source around the failing frames.
+        
+        Args:
+            error_text: The program's error output
+            base_dir: Directory relative frame paths are resolved against
+            error_budget: Maximum characters of error output
+            source_budget: Maximum characters of source context
+            
+        Returns:
+            Prompt string; the same as build_prompt when no frames are found
+        """
+        frames = parse_frames(error_text)
+        if not frames:
+            return self.build_prompt(trim_error_output(error_text, error_budget))
+        
+        context = {}
+        error_type = self._detect_error_type(error_text)
+        if error_type:
+            context['Error type'] = error_type
+        innermost = frames[-1]
+        context['Failing frame'] = f"{innermost['file']}:{innermost['line']}" + (
+            f" in {innermost['function']}" if innermost['function'] else ""
+        )
+        context['Stack depth'] = len(frames)
+        
+        source_context = build_source_context(frames, self.line_cache, base_dir, source_budget)
+        return self.build_debug_prompt(trim_error_output(error_text, error_budget), context, source_context) 
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+pytest Plugin for termExplain
+
+Run pytest with --explain-failures to get an explanation of each unique
+failure at the end of the session. Tracebacks are only collected for failed
+tests, and termExplain itself is imported only if something failed, so
+passing runs pay nothing.
+"""
+
+from typing import Dict, List
+
+# Longest traceback tail sent for one failure
+MAX_TRACEBACK_CHARS = 4000
+
+def pytest_addoption(parser):
+    group = parser.getgroup("termexplain")
+    group.addoption(
+        "--explain-failures",
+        action="store_true",
+        default=False,
+        help="Explain unique test failures with termExplain at the end of the session",
+    )
+    group.addoption(
+        "--explain-workers",
+        type=int,
+        default=4,
+        help="Maximum concurrent explanations (default: 4)",
+    )
+
+def pytest_configure(config):
+    if config.getoption("explain_failures"):
+        config.pluginmanager.register(FailureExplainer(config), "termexplain-failures")
+
+class FailureExplainer:
+    """Collects failing tracebacks and explains the unique ones at session end."""
+
+    def __init__(self, config):
+        self.config = config
+        # traceback text -> node ids that failed with it
+        self.failures: Dict[str, List[str]] = {}
+
+    def pytest_runtest_logreport(self, report):
+        if not report.failed:
+            return
+        text = report.longreprtext[-MAX_TRACEBACK_CHARS:].strip()
+        if text:
+            self.failures.setdefault(text, []).append(report.nodeid)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.failures:
+            return
+
+        from termexplain.api import Explainer
+        from termexplain.utils.fingerprint import fingerprint
+
+        # Failures differing only in line numbers, addresses or ids share one explanation
+        groups: Dict[str, List[str]] = {}
+        texts: Dict[str, str] = {}
+        for text, node_ids in self.failures.items():
+            key = fingerprint(text)
+            texts.setdefault(key, text)
+            groups.setdefault(key, []).extend(node_ids)
+
+        terminalreporter.section("termExplain")
+        try:
+            explainer = Explainer(max_workers=self.config.getoption("explain_workers"))
+        except Exception as e:
+            terminalreporter.write_line(f"termExplain unavailable: {e}")
+            return
+
+        keys = list(groups)
+        results = explainer.explain_many([texts[key] for key in keys])
+        for key, result in zip(keys, results):
+            node_ids = groups[key]
+            terminalreporter.write_line("")
+            terminalreporter.write_line(
+                ", ".join(node_ids[:3]) + (f" (+{len(node_ids) - 3} more)" if len(node_ids) > 3 else ""),
+                bold=True,
+            )
+            if result['explanation'] is None:
+                terminalreporter.write_line(f"Could not explain: {result['failed']}", red=True)
+            else:
+                terminalreporter.write_line(result['explanation'])
@@ -0,0 +1,226 @@
+"""
+Model Routing for termExplain
+
+Scores how complex an error is (size, stack depth, recognised category) and
+picks a route from a table: which model to call, how many output tokens to
+allow and whether to send the short or the full prompt. A one-line
+`command not found` goes to a small model with a short prompt; a deep
+traceback gets the full treatment. Latency and token usage are recorded per
+route so the table can be tuned from real numbers.
+
+The table can be replaced with a JSON file named by $TERMEXPLAIN_ROUTES: a
+list of objects with name, max_score, model, max_output_tokens and template.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+import logging
+
+from termexplain.utils.filelock import file_lock
+from termexplain.utils.traceback_parser import parse_frames
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# Checked in order; the first route whose max_score is at least the error's
+# score wins (None matches everything)
+DEFAULT_ROUTES = [
+    {'name': 'trivial', 'max_score': 1, 'model': "gemini-2.0-flash-lite", 'max_output_tokens': 200,
+     'template': 'short'},
+    {'name': 'standard', 'max_score': 4, 'model': DEFAULT_MODEL, 'max_output_tokens': 500, 'template': 'full'},
+    {'name': 'complex', 'max_score': None, 'model': DEFAULT_MODEL, 'max_output_tokens': 1024, 'template': 'full'},
+]
+
+TEMPLATES = ('short', 'full')
+
+class Route:
+    """One row of the routing table."""
+
+    def __init__(self, name: str, model: str = DEFAULT_MODEL, max_output_tokens: int = 500,
+                 template: str = 'full', max_score: Optional[int] = None):
+        """
+        Initialize the route.
+
+        Args:
+            name: Route name used in statistics
+            model: Gemini model name
+            max_output_tokens: Output token limit
+            template: Prompt template, 'short' or 'full'
+            max_score: Highest complexity score this route takes (None: any)
+        """
+        if template not in TEMPLATES:
+            raise ValueError(f"Unknown prompt template for route {name}: {template}")
+        self.name = name
+        self.model = model
+        self.max_output_tokens = max_output_tokens
+        self.template = template
+        self.max_score = max_score
+
+    def __repr__(self) -> str:
+        return f"Route({self.name!r}, model={self.model!r}, max_output_tokens={self.max_output_tokens})"
+
+def load_routes(path: Optional[str] = None) -> List[Route]:
+    """
+    Load the routing table.
+
+    Args:
+        path: JSON file with the table (default: $TERMEXPLAIN_ROUTES, else the built-in table)
+
+    Returns:
+        Routes in the order they are checked
+    """
+    path = path or os.getenv('TERMEXPLAIN_ROUTES')
+    table = DEFAULT_ROUTES
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+    routes = [Route(**row) for row in table]
+    if not routes or routes[-1].max_score is not None:
+        # Make sure every error has somewhere to go
+        routes.append(Route('fallback'))
+    return routes
+
+def score_complexity(error_text: str, error_type: Optional[str] = None) -> int:
+    """
+    Score how much reasoning an error is likely to need.
+
+    Args:
+        error_text: The error text
+        error_type: Category from PromptBuilder.detect_error_type
+
+    Returns:
+        Score from 0 (one-line, recognised error) upwards
+    """
+    size = len(error_text)
+    score = 0 if size < 300 else 1 if size < 2000 else 2 if size < 8000 else 3
+
+    frames = len(parse_frames(error_text))
+    score += 0 if not frames else 1 if frames <= 5 else 2 if frames <= 30 else 3
+
+    # Chained exceptions ("During handling of the above exception...")
+    if error_text.count("Traceback (most recent call last):") > 1:
+        score += 1
+    # Unrecognised errors need the model to work out what it is looking at
+    if error_type is None:
+        score += 1
+    return score
+
+class Router:
+    """Picks a route for each error."""
+
+    def __init__(self, routes: Optional[List[Route]] = None):
+        """
+        Initialize the router.
+
+        Args:
+            routes: Routing table (default: load_routes())
+        """
+        self.routes = routes if routes is not None else load_routes()
+        self.logger = logging.getLogger(__name__)
+
+    def route(self, error_text: str, error_type: Optional[str] = None, template: Optional[str] = None) -> Route:
+        """
+        Pick the route for an error.
+
+        Args:
+            error_text: The error text (or the prepared prompt) to score
+            error_type: Category from PromptBuilder.detect_error_type
+            template: Only consider routes using this prompt template
+
+        Returns:
+            The first route whose max_score covers the error's score
+        """
+        routes = [route for route in self.routes if template is None or route.template == template]
+        if not routes:
+            routes = [Route('fallback', template=template)]
+        score = score_complexity(error_text, error_type)
+        for route in routes:
+            if route.max_score is None or score <= route.max_score:
+                self.logger.info(f"Complexity {score}: routing to {route.name}")
+                return route
+        return routes[-1]
+
+class RouteStats:
+    """Calls, latency and token usage per route."""
+
+    def __init__(self, history_file: Optional[str] = None):
+        """
+        Initialize the statistics.
+
+        Args:
+            history_file: JSON file that keeps totals between runs (optional)
+        """
+        self.history_file = history_file
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+        if history_file:
+            self._routes = self._read_history()
+
+    def record(self, route: Route, seconds: float, usage=None):
+        """
+        Record one completed call.
+
+        Args:
+            route: Route the call took
+            seconds: Call latency
+            usage: The response's usage_metadata, if it has one
+        """
+        prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+        output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+        with self._lock:
+            if not self.history_file:
+                self._add(self._routes, route.name, seconds, prompt_tokens, output_tokens)
+                return
+
+            # Add to the totals on disk, so concurrent processes don't overwrite each other's calls
+            with file_lock(self.history_file):
+                routes = self._read_history()
+                self._add(routes, route.name, seconds, prompt_tokens, output_tokens)
+                self._routes = routes
+                try:
+                    tmp_path = f"{self.history_file}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(routes, f)
+                    os.replace(tmp_path, self.history_file)
+                except IOError:
+                    pass
+
+    @staticmethod
+    def _add(routes: Dict[str, Dict[str, float]], name: str, seconds: float, prompt_tokens: int,
+             output_tokens: int):
+        totals = routes.setdefault(name, {
+            'calls': 0, 'latency_seconds': 0.0, 'prompt_tokens': 0, 'output_tokens': 0,
+        })
+        totals['calls'] += 1
+        totals['latency_seconds'] += seconds
+        totals['prompt_tokens'] += prompt_tokens
+        totals['output_tokens'] += output_tokens
+
+    def _read_history(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                return {name: dict(totals) for name, totals in json.load(f).items()}
+        except (IOError, ValueError, TypeError, AttributeError):
+            return {}
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize the statistics.
+
+        Returns:
+            Per route: calls, mean latency and mean prompt/output tokens
+        """
+        with self._lock:
+            routes = {name: dict(totals) for name, totals in self._routes.items()}
+        summary = {}
+        for name, totals in routes.items():
+            calls = totals['calls'] or 1
+            summary[name] = {
+                'calls': int(totals['calls']),
+                'mean_latency_ms': round(totals['latency_seconds'] / calls * 1000, 1),
+                'mean_prompt_tokens': round(totals['prompt_tokens'] / calls, 1),
+                'mean_output_tokens': round(totals['output_tokens'] / calls, 1),
+            }
+        return summary
@@ -0,0 +1,340 @@
+"""
+Explain Service for termExplain
+
+Serves the explain pipeline (cache -> prompt -> Gemini -> parsed sections)
+over a small local HTTP/JSON API, so many clients share one warm cache and
+one bounded pool of upstream model calls.
+
+Endpoints:
+    POST /explain   {"error": "..."} or {"errors": ["...", ...]}
+    GET  /metrics   request rate, cache hit ratio, latency histograms
+    GET  /healthz   liveness check
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from termexplain.utils.metrics import LatencyHistogram, RateCounter
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_SIZE = 100
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+class ServiceMetrics:
+    """Counters and histograms exposed on /metrics."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_failures = 0
+        self.request_rate = RateCounter()
+        self.request_latency = LatencyHistogram()
+        self.upstream_latency = LatencyHistogram()
+
+    def to_dict(self, in_flight: int, queued: int) -> Dict[str, Any]:
+        """Summarize all metrics."""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'requests_total': self.requests,
+            'requests_per_second': self.request_rate.per_second(),
+            'errors_total': self.errors,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_hit_ratio': round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            'coalesced_requests': self.coalesced,
+            'upstream_calls': self.upstream_calls,
+            'upstream_failures': self.upstream_failures,
+            'upstream_in_flight': in_flight,
+            'upstream_queued': queued,
+            'request_latency': self.request_latency.to_dict(),
+            'upstream_latency': self.upstream_latency.to_dict(),
+        }
+
+class ExplainService:
+    """Async explain pipeline shared by all clients."""
+
+    def __init__(self, gemini_client, prompt_builder, formatter, cache, max_upstream: int = 4, save: bool = True):
+        """
+        Initialize the service.
+
+        Args:
+            gemini_client: GeminiClient used for cache misses
+            prompt_builder: PromptBuilder for prompts
+            formatter: OutputFormatter used to split explanations into sections
+            cache: Thread-safe cache shared by every client (TieredCache)
+            max_upstream: Maximum concurrent model calls
+            save: Cache fresh explanations
+        """
+        self.gemini_client = gemini_client
+        self.prompt_builder = prompt_builder
+        self.formatter = formatter
+        self.cache = cache
+        self.max_upstream = max_upstream
+        self.save = save
+        self.metrics = ServiceMetrics()
+        self.logger = logging.getLogger(__name__)
+
+        # The blocking Gemini client and cache run on worker threads. Cache calls
+        # can block too (shared-tier timeouts, JSON rewrites on expiry), and get
+        # their own pool so they never queue behind slow model calls
+        self._executor = ThreadPoolExecutor(max_workers=max_upstream, thread_name_prefix="termexplain-upstream")
+        self._cache_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="termexplain-cache")
+        self._upstream_slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, "asyncio.Future[str]"] = {}
+        self._active = 0
+        self._waiting = 0
+
+    async def explain(self, error_text: str, no_cache: bool = False) -> Dict[str, Any]:
+        """
+        Explain one error.
+
+        Args:
+            error_text: The error text
+            no_cache: Skip the cache lookup
+
+        Returns:
+            Result dictionary with explanation, sections and cache status
+        """
+        start = time.monotonic()
+        key = self.cache.cache_key(error_text)
+
+        explanation = None
+        if not no_cache:
+            loop = asyncio.get_running_loop()
+            explanation = await loop.run_in_executor(self._cache_executor, self.cache.get, error_text)
+        cached = explanation is not None
+        if cached:
+            self.metrics.cache_hits += 1
+        else:
+            self.metrics.cache_misses += 1
+            explanation = await self._fetch(key, error_text)
+
+        return {
+            'error': error_text,
+            'explanation': explanation,
+            'sections': self.formatter.parse_sections(explanation),
+            'cached': cached,
+            'latency_ms': round((time.monotonic() - start) * 1000, 2),
+        }
+
+    async def _fetch(self, key: str, error_text: str) -> str:
+        """Fetch from Gemini, sharing one call among identical concurrent requests."""
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.metrics.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            explanation = await self._call_upstream(error_text)
+            if self.save:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._cache_executor, self.cache.save, error_text, explanation)
+            future.set_result(explanation)
+            return explanation
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so lone failures don't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _call_upstream(self, error_text: str) -> str:
+        """Run one model call within the bounded upstream pool."""
+        if self._upstream_slots is None:
+            self._upstream_slots = asyncio.Semaphore(self.max_upstream)
+
+        self._waiting += 1
+        async with self._upstream_slots:
+            self._waiting -= 1
+            self._active += 1
+            start = time.monotonic()
+            try:
+                route = self.prompt_builder.route(error_text)
+                prompt = self.prompt_builder.build_prompt(error_text, route)
+                loop = asyncio.get_running_loop()
+                self.metrics.upstream_calls += 1
+                return await loop.run_in_executor(self._executor, self.gemini_client.get_explanation, prompt, route)
+            except Exception:
+                self.metrics.upstream_failures += 1
+                raise
+            finally:
+                self._active -= 1
+                self.metrics.upstream_latency.observe(time.monotonic() - start)
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """
+        Route one HTTP request.
+
+        Args:
+            method: HTTP method
+            path: Request path
+            body: Request body
+
+        Returns:
+            Tuple of (status code, JSON-serializable response)
+        """
+        path = path.split("?", 1)[0]
+        if path == "/healthz":
+            return 200, {'status': 'ok'}
+        if path == "/metrics":
+            return 200, {**self.metrics.to_dict(self._active, self._waiting),
+                         'routes': self.gemini_client.route_stats.to_dict()}
+        if path != "/explain":
+            return 404, {'error': f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {'error': "Use POST /explain"}
+
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            return 400, {'error': f"Invalid JSON: {e}"}
+        if not isinstance(payload, dict):
+            return 400, {'error': "Expected a JSON object"}
+
+        no_cache = bool(payload.get('no_cache', False))
+        if isinstance(payload.get('errors'), list):
+            errors = payload['errors']
+            if len(errors) > MAX_BATCH_SIZE:
+                return 413, {'error': f"Batch larger than {MAX_BATCH_SIZE} errors"}
+        elif isinstance(payload.get('error'), str):
+            errors = None
+        else:
+            return 400, {'error': 'Provide "error" (string) or "errors" (list of strings)'}
+
+        if errors is None:
+            return 200, await self.explain(payload['error'], no_cache)
+
+        results: List[Any] = await asyncio.gather(
+            *(self.explain(str(error), no_cache) for error in errors), return_exceptions=True
+        )
+        return 200, {
+            'results': [
+                {'error': str(error), 'failed': str(result)} if isinstance(result, Exception) else result
+                for error, result in zip(errors, results)
+            ]
+        }
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection (keep-alive supported)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == "HTTP/1.1" and headers.get('connection', '').lower() != 'close')
+                raw_length = headers.get('content-length', '') or '0'
+                if not (raw_length.isascii() and raw_length.isdigit()):
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, False)
+                    break
+                length = int(raw_length)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                start = time.monotonic()
+                self.metrics.requests += 1
+                self.metrics.request_rate.mark()
+                try:
+                    status, response = await self.handle(method, path, body)
+                except Exception as e:
+                    self.logger.error(f"Request failed: {e}")
+                    status, response = 502, {'error': str(e)}
+                if status >= 400:
+                    self.metrics.errors += 1
+                self.metrics.request_latency.observe(time.monotonic() - start)
+
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, response: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Unknown')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        """
+        Start listening.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+
+        Returns:
+            The running asyncio server
+        """
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+    def shutdown(self):
+        """Stop the upstream and cache worker pools."""
+        self._executor.shutdown(wait=False)
+        self._cache_executor.shutdown(wait=False)
+
+def run_server(service: ExplainService, host: str = "127.0.0.1", port: int = 8765, on_ready=None):
+    """
+    Run the service until interrupted.
+
+    Args:
+        service: ExplainService to serve
+        host: Interface to bind
+        port: Port to bind
+        on_ready: Called with the bound (host, port) once listening
+    """
+    async def main():
+        server = await service.start(host, port)
+        if on_ready:
+            on_ready(server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    finally:
+        service.shutdown()
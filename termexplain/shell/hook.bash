@@ -0,0 +1,98 @@
+# termExplain shell hook for bash
+#
+# Records the exit status and command line of every failed command into a
+# small ring buffer, so a bare `explain` can explain it. Successful commands
+# only cost one builtin truncate; nothing is spawned.
+#
+# Enable with:  eval "$(explain hook bash)"
+# Set TERMEXPLAIN_CAPTURE_STDERR=1 beforehand to also record the tail of
+# stderr. This routes the shell's stderr through a pipe to tee, so programs
+# no longer see a terminal on stderr: colour diagnostics and progress bars
+# turn off, and stderr may print after the next prompt.
+
+if [[ $- == *i* && -z "$_termexplain_hooked" ]]; then
+    _termexplain_hooked=1
+    export TERMEXPLAIN_RING="${XDG_CACHE_HOME:-$HOME/.cache}/termexplain/ring/$$"
+    mkdir -p "$TERMEXPLAIN_RING"
+    _termexplain_stderr="$TERMEXPLAIN_RING/stderr"
+    _termexplain_slot=0
+    _termexplain_at_prompt=""
+    _termexplain_ran=""
+    _termexplain_last_number=""
+    : > "$_termexplain_stderr"
+
+    if [[ "${TERMEXPLAIN_CAPTURE_STDERR:-0}" == 1 ]]; then
+        exec 2> >(tee -a "$_termexplain_stderr" >&2)
+    fi
+
+    _termexplain_record() {
+        local command="${2//$'\n'/ }"
+        command="${command#"${command%%[![:space:]]*}"}"
+        case "$command" in
+            explain*|termexplain*) return ;;
+        esac
+        {
+            printf 'status=%s\ncwd=%s\ncommand=%s\n\n' "$1" "$PWD" "$command"
+            tail -c "${TERMEXPLAIN_TAIL_BYTES:-4096}" "$_termexplain_stderr"
+        } > "$TERMEXPLAIN_RING/$_termexplain_slot"
+        printf '%s' "$_termexplain_slot" > "$TERMEXPLAIN_RING/last"
+        _termexplain_slot=$(( (_termexplain_slot + 1) % ${TERMEXPLAIN_RING_SIZE:-8} ))
+    }
+
+    # bash has no preexec; the DEBUG trap runs before every simple command,
+    # so only the first one after the prompt is drawn counts as a command start
+    _termexplain_preexec() {
+        [[ -n "$_termexplain_at_prompt" ]] || return
+        _termexplain_at_prompt=""
+        # An empty command line goes straight back to PROMPT_COMMAND
+        [[ "$BASH_COMMAND" == _termexplain_precmd ]] && return
+        _termexplain_ran=1
+        # Truncate here so the prompt and the echoed command line never end up in the log
+        : > "$_termexplain_stderr"
+    }
+
+    _termexplain_precmd() {
+        local exit_status=$? entry number
+        # 130 is Ctrl-C, which is not worth explaining
+        if (( exit_status != 0 && exit_status != 130 )); then
+            # bash keeps $? across an empty Enter; only a command that ran,
+            # or a new history entry if another tool owns the DEBUG trap, counts
+            # -0, not -1: fc assumes it is itself the newest entry, which isn't so here
+            entry=$(fc -l -0 2>/dev/null)
+            number="${entry%%$'\t'*}"
+            number="${number//[[:space:]]/}"
+            if [[ -n "$_termexplain_ran" || "$number" != "$_termexplain_last_number" ]]; then
+                _termexplain_record "$exit_status" "${entry#*$'\t'}"
+            fi
+            _termexplain_last_number=$number
+        fi
+        _termexplain_ran=""
+        return $exit_status
+    }
+
+    # Keep traps that were set before the hook
+    _termexplain_prev_exit=$(trap -p EXIT)
+    _termexplain_prev_exit=${_termexplain_prev_exit#"trap -- "}
+    eval "_termexplain_prev_exit=${_termexplain_prev_exit% EXIT}"
+    _termexplain_prev_debug=$(trap -p DEBUG)
+    _termexplain_prev_debug=${_termexplain_prev_debug#"trap -- "}
+    eval "_termexplain_prev_debug=${_termexplain_prev_debug% DEBUG}"
+
+    _termexplain_exit() {
+        rm -rf "$TERMEXPLAIN_RING"
+        if [[ -n "$_termexplain_prev_exit" ]]; then
+            eval "$_termexplain_prev_exit"
+        fi
+    }
+
+    _termexplain_debug() {
+        _termexplain_preexec
+        if [[ -n "$_termexplain_prev_debug" ]]; then
+            eval "$_termexplain_prev_debug"
+        fi
+    }
+
+    trap _termexplain_exit EXIT
+    trap _termexplain_debug DEBUG
+    PROMPT_COMMAND="_termexplain_precmd${PROMPT_COMMAND:+;$PROMPT_COMMAND};_termexplain_at_prompt=1"
+fi
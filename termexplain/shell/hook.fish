@@ -0,0 +1,36 @@
+# termExplain shell hook for fish
+#
+# Records the exit status and command line of every failed command into a
+# small ring buffer, so a bare `explain` can explain it. fish cannot redirect
+# its own stderr, so no stderr tail is captured; nothing is spawned for
+# successful commands.
+#
+# Enable with:  explain hook fish | source
+
+if status is-interactive; and not set -q _termexplain_hooked
+    set -g _termexplain_hooked 1
+    set -q XDG_CACHE_HOME; or set -l XDG_CACHE_HOME $HOME/.cache
+    set -gx TERMEXPLAIN_RING $XDG_CACHE_HOME/termexplain/ring/$fish_pid
+    mkdir -p $TERMEXPLAIN_RING
+    set -g _termexplain_slot 0
+
+    function _termexplain_postexec --on-event fish_postexec
+        set -l exit_status $status
+        # 130 is Ctrl-C, which is not worth explaining
+        if test $exit_status -eq 0 -o $exit_status -eq 130
+            return
+        end
+        set -l command (string join ' ' -- $argv)
+        if string match -qr '^\s*(explain|termexplain)' -- $command
+            return
+        end
+        printf 'status=%s\ncwd=%s\ncommand=%s\n\n' $exit_status $PWD $command > $TERMEXPLAIN_RING/$_termexplain_slot
+        printf '%s' $_termexplain_slot > $TERMEXPLAIN_RING/last
+        set -q TERMEXPLAIN_RING_SIZE; or set -l TERMEXPLAIN_RING_SIZE 8
+        set -g _termexplain_slot (math "($_termexplain_slot + 1) % $TERMEXPLAIN_RING_SIZE")
+    end
+
+    function _termexplain_cleanup --on-event fish_exit
+        rm -rf $TERMEXPLAIN_RING
+    end
+end
@@ -0,0 +1,88 @@
+"""
+Shell Hook for termExplain
+
+Provides the bash/zsh/fish hook scripts and reads the failures they record,
+so a bare `explain` can explain the last failed command.
+"""
+
+import os
+import re
+from typing import Dict, Optional
+
+SHELL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shell")
+SUPPORTED_SHELLS = ("bash", "zsh", "fish")
+
+# Terminal control sequences (e.g. bracketed-paste toggles) and carriage returns
+TERMINAL_CONTROL = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b[()][A-Za-z0-9]|\r")
+
+def get_hook_script(shell: str) -> str:
+    """
+    Get the hook script for a shell.
+
+    Args:
+        shell: One of "bash", "zsh" or "fish"
+
+    Returns:
+        Hook script source
+    """
+    if shell not in SUPPORTED_SHELLS:
+        raise ValueError(f"Unsupported shell: {shell}. Supported shells: {', '.join(SUPPORTED_SHELLS)}")
+
+    with open(os.path.join(SHELL_DIR, f"hook.{shell}"), "r", encoding="utf-8") as f:
+        return f.read()
+
+def read_last_failure(ring_dir: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """
+    Read the most recent failure recorded by the shell hook.
+
+    Args:
+        ring_dir: Ring buffer directory (default: $TERMEXPLAIN_RING)
+
+    Returns:
+        Dictionary with status, cwd, command and stderr, or None if the hook
+        is not active or nothing has failed yet
+    """
+    ring_dir = ring_dir or os.environ.get("TERMEXPLAIN_RING")
+    if not ring_dir:
+        return None
+
+    try:
+        with open(os.path.join(ring_dir, "last"), "r", encoding="utf-8") as f:
+            slot = f.read().strip()
+        with open(os.path.join(ring_dir, slot), "r", encoding="utf-8", errors="replace") as f:
+            content = f.read()
+    except (OSError, ValueError):
+        return None
+
+    header, _, stderr = content.partition("\n\n")
+    failure = {"status": "", "cwd": "", "command": "", "stderr": ""}
+    for line in header.splitlines():
+        key, sep, value = line.partition("=")
+        if sep and key in failure:
+            failure[key] = value
+    failure["stderr"] = _clean_stderr(stderr, failure["command"])
+    return failure
+
+def _clean_stderr(stderr: str, command: str) -> str:
+    """Drop terminal control codes and the echoed command line from captured stderr."""
+    lines = TERMINAL_CONTROL.sub("", stderr).strip().splitlines()
+    # tee may still be writing readline's echo of the command when the hook
+    # truncates the log at command start
+    if lines and command and lines[0].strip() == command.strip():
+        lines = lines[1:]
+    return "\n".join(lines).strip()
+
+def format_failure(failure: Dict[str, str]) -> str:
+    """
+    Turn a recorded failure into error text for the prompt.
+
+    Args:
+        failure: Failure dictionary from read_last_failure
+
+    Returns:
+        Error text describing the failed command
+    """
+    lines = [f"$ {failure['command']}", f"(exit status {failure['status']})"]
+    if failure["stderr"]:
+        lines.append(failure["stderr"])
+    return "\n".join(lines)
@@ -4,27 +4,118 @@ Cache Module for termExplain
 Handles caching of error explanations to avoid repeated API calls.
 """
 
+import difflib
 import json
 import hashlib
 import os
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, TextIO
 import logging
 
+from termexplain.utils.filelock import file_lock
+from termexplain.utils.fingerprint import normalize_error
+from termexplain.utils.store import CompressedStore, EntryCodec
+from termexplain.utils.search_index import SearchIndex
+
+# Where caches lived before default_cache_dir: ./history in the working directory
+LEGACY_CACHE_DIR = "history"
+
+def default_cache_dir() -> str:
+    """
+    Get the default cache directory.
+    
+    Uses $TERMEXPLAIN_CACHE_DIR if set, otherwise $XDG_CACHE_HOME/termexplain
+    (~/.cache/termexplain), so the cache no longer depends on the working directory.
+    
+    Returns:
+        Absolute path of the cache directory
+    """
+    override = os.getenv('TERMEXPLAIN_CACHE_DIR')
+    if override:
+        return os.path.abspath(os.path.expanduser(override))
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'termexplain')
+
+class _TrackedDict(dict):
+    """In-memory JSON cache that remembers which keys changed since it was written."""
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.reset()
+    
+    def reset(self):
+        self.changed = set()
+        self.removed = set()
+        self.cleared = False
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.changed.add(key)
+        self.removed.discard(key)
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.removed.add(key)
+        self.changed.discard(key)
+    
+    def pop(self, key, *default):
+        if key in self:
+            value = super().pop(key)
+            self.removed.add(key)
+            self.changed.discard(key)
+            return value
+        return super().pop(key, *default)
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+    
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, "items") else other
+        for key, value in list(items) + list(kwargs.items()):
+            self[key] = value
+    
+    def clear(self):
+        super().clear()
+        self.reset()
+        self.cleared = True
+    
+    def merged_into(self, on_disk: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply this process's unsaved changes on top of what is on disk."""
+        merged = {} if self.cleared else dict(on_disk)
+        for key in self.removed:
+            merged.pop(key, None)
+        for key in self.changed:
+            merged[key] = dict.__getitem__(self, key)
+        return merged
+
 class ErrorCache:
     """Cache for storing error explanations locally."""
     
-    def __init__(self, cache_dir: str = "history", max_age_days: int = 30):
+    def __init__(self, cache_dir: Optional[str] = None, max_age_days: int = 30, storage: str = "auto"):
         """
         Initialize the cache.
         
         Args:
-            cache_dir: Directory to store cache files
+            cache_dir: Directory to store cache files (default: default_cache_dir())
             max_age_days: Maximum age of cache entries in days
+            storage: "json", "binary" (compressed store), or "auto" to use the
+                compressed store once one has been created by migration
         """
+        use_default = not cache_dir and not os.getenv('TERMEXPLAIN_CACHE_DIR')
+        cache_dir = cache_dir or default_cache_dir()
         self.cache_dir = cache_dir
         self.max_age_days = max_age_days
-        self.cache_file = os.path.join(cache_dir, "error_logs.json")
+        self.json_file = os.path.join(cache_dir, "error_logs.json")
+        self.store_file = os.path.join(cache_dir, "error_logs.bin")
+        
+        if storage == "auto":
+            storage = "binary" if os.path.exists(self.store_file) else "json"
+        if storage not in ("json", "binary"):
+            raise ValueError(f"Unknown cache storage: {storage}")
+        self.storage = storage
+        self.cache_file = self.store_file if storage == "binary" else self.json_file
         
         # Ensure cache directory exists
         os.makedirs(cache_dir, exist_ok=True)
@@ -34,44 +125,65 @@ class ErrorCache:
         self.logger.setLevel(logging.WARNING)
         
         # Load existing cache
+        self._disk_state = None
         self.cache_data = self._load_cache()
+        if use_default:
+            self._import_legacy_cache()
     
     def get(self, error_text: str) -> Optional[str]:
         """
         Get cached explanation for an error.
         
+        The exact text is looked up first, then its fingerprint, which
+        matches entries saved with by_fingerprint (e.g. by `explain index warm`).
+        
         Args:
             error_text: The error text to look up
             
         Returns:
             Cached explanation if found and not expired, None otherwise
         """
-        error_hash = self._hash_error(error_text)
+        keys = [self._hash_error(error_text)]
+        fingerprint_key = self.fingerprint_key(error_text)
+        if fingerprint_key != keys[0]:
+            keys.append(fingerprint_key)
         
-        if error_hash in self.cache_data:
-            entry = self.cache_data[error_hash]
+        explanation = self._get_any(keys, error_text)
+        if explanation is None and self.storage == "json" and self._refresh_json():
+            # Another process wrote the file since we read it
+            explanation = self._get_any(keys, error_text)
+        return explanation
+    
+    def _get_any(self, keys: List[str], error_text: str) -> Optional[str]:
+        """Return the first live entry's explanation among keys."""
+        for error_hash in keys:
+            # A damaged compressed record reads as a miss
+            entry = self.cache_data.get(error_hash)
+            if entry is None:
+                continue
             
             # Check if entry is expired
             if self._is_expired(entry):
                 self.logger.info(f"Cache entry expired for error: {error_text[:50]}...")
                 del self.cache_data[error_hash]
                 self._save_cache()
-                return None
+                continue
             
             self.logger.info(f"Cache hit for error: {error_text[:50]}...")
             return entry['explanation']
-        
         return None
     
-    def save(self, error_text: str, explanation: str):
+    def save(self, error_text: str, explanation: str, by_fingerprint: bool = False):
         """
         Save an explanation to cache.
         
         Args:
             error_text: The error text
             explanation: The AI-generated explanation
+            by_fingerprint: Key the entry by the normalized error, so repeats
+                differing only in timestamps, ids, paths or numbers hit it
         """
-        error_hash = self._hash_error(error_text)
+        error_hash = self.fingerprint_key(error_text) if by_fingerprint else self._hash_error(error_text)
         
         entry = {
             'error_text': error_text,
@@ -92,15 +204,14 @@ class ErrorCache:
         Returns:
             Number of entries cleared
         """
-        initial_count = len(self.cache_data)
-        expired_keys = []
-        
-        for key, entry in self.cache_data.items():
-            if self._is_expired(entry):
-                expired_keys.append(key)
+        expired_keys = self._expired_keys()
         
-        for key in expired_keys:
-            del self.cache_data[key]
+        if self.storage == "binary":
+            # One append for the whole batch of tombstones
+            self.cache_data.delete_many(expired_keys)
+        else:
+            for key in expired_keys:
+                del self.cache_data[key]
         
         if expired_keys:
             self._save_cache()
@@ -110,7 +221,7 @@ class ErrorCache:
     
     def clear_all(self):
         """Clear all cache entries."""
-        self.cache_data = {}
+        self.cache_data.clear()
         self._save_cache()
         self.logger.info("Cleared all cache entries")
     
@@ -122,19 +233,213 @@ class ErrorCache:
             Dictionary with cache statistics
         """
         total_entries = len(self.cache_data)
-        expired_entries = sum(1 for entry in self.cache_data.values() if self._is_expired(entry))
+        expired_entries = len(self._expired_keys())
         valid_entries = total_entries - expired_entries
         
         # Calculate cache size
         cache_size = os.path.getsize(self.cache_file) if os.path.exists(self.cache_file) else 0
         
-        return {
+        stats = {
+            'storage': self.storage,
             'total_entries': total_entries,
             'valid_entries': valid_entries,
             'expired_entries': expired_entries,
             'cache_size_bytes': cache_size,
             'cache_size_mb': round(cache_size / (1024 * 1024), 2)
         }
+        
+        if self.storage == "binary":
+            stats.update(self.cache_data.get_stats())
+        
+        return stats
+    
+    def get_timestamps(self) -> Dict[str, str]:
+        """
+        Get every entry's timestamp without decoding entries.
+        
+        Returns:
+            Dictionary mapping cache keys to timestamp strings
+        """
+        if self.storage == "binary":
+            return {key: repr(self.cache_data.timestamp(key)) for key in self.cache_data}
+        return {key: entry.get('timestamp', '') for key, entry in self.cache_data.items()}
+    
+    def change_marker(self) -> str:
+        """
+        Get a marker that changes whenever cache contents change.
+        
+        Returns:
+            Opaque marker string for changes_since
+        """
+        if self.storage == "binary":
+            return f"binary:{self.cache_data.marker()}"
+        try:
+            stat = os.stat(self.cache_file)
+        except OSError:
+            return "json:"
+        return f"json:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+    
+    def changes_since(self, marker: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the entries changed since an earlier change_marker().
+        
+        Args:
+            marker: Earlier change_marker() value
+            
+        Returns:
+            Dictionary with 'timestamps' (key -> timestamp of entries written)
+            and 'removed' (keys), or None if every entry has to be compared
+        """
+        if self.storage != "binary" or not marker.startswith("binary:"):
+            return None
+        changes = self.cache_data.changes_since(marker[len("binary:"):])
+        if changes is None:
+            return None
+        written, removed = changes
+        return {
+            'timestamps': {key: repr(self.cache_data.timestamp(key)) for key in written},
+            'removed': removed,
+        }
+    
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Search cached entries using the token index.
+        
+        Args:
+            query: Search terms; entries must contain all of them
+            limit: Maximum number of results
+            
+        Returns:
+            List of matching cache entries
+        """
+        index = SearchIndex(self.cache_dir)
+        try:
+            index.sync(self)
+            entries = (self.cache_data.get(key) for key in index.search(query, limit))
+            return [entry for entry in entries if entry is not None]
+        finally:
+            index.close()
+    
+    def find_similar(self, error_text: str, min_similarity: float = 0.6, lock=None) -> Optional[Dict[str, Any]]:
+        """
+        Find the cached entry whose error is most similar to error_text.
+        
+        Candidates come from the search index, so only a handful of entries
+        are compared.
+        
+        Args:
+            error_text: The error text to match
+            min_similarity: Minimum similarity ratio (0-1) to accept
+            lock: Lock guarding this cache; held only while entries are read
+            
+        Returns:
+            The best matching entry with a 'similarity' field, or None
+        """
+        index = SearchIndex(self.cache_dir)
+        try:
+            index.sync(self, lock)
+            keys = index.candidates(error_text)
+        finally:
+            index.close()
+        
+        if lock is not None:
+            with lock:
+                entries = [self.cache_data.get(key) for key in keys]
+        else:
+            entries = [self.cache_data.get(key) for key in keys]
+        
+        best, best_score = None, min_similarity
+        for entry in entries:
+            if entry is None or self._is_expired(entry):
+                continue
+            score = difflib.SequenceMatcher(None, error_text[:2000], entry.get('error_text', '')[:2000]).ratio()
+            if score >= best_score:
+                best, best_score = entry, score
+        
+        if best is not None:
+            best = dict(best, similarity=round(best_score, 3))
+        return best
+    
+    def vacuum(self, retrain: bool = False) -> Dict[str, int]:
+        """
+        Compact cache storage and the search index.
+        
+        Args:
+            retrain: Retrain the shared dictionary (compressed storage only)
+            
+        Returns:
+            Dictionary with file sizes before and after
+        """
+        before = os.path.getsize(self.cache_file) if os.path.exists(self.cache_file) else 0
+        
+        if self.storage == "binary":
+            dictionary = None
+            if retrain:
+                # Entries are decoded one at a time; training only keeps line counts
+                dictionary = EntryCodec.train(self.iter_entries())
+            self.cache_data.rewrite(dictionary)
+        else:
+            self._save_cache()
+        
+        index = SearchIndex(self.cache_dir)
+        try:
+            index.sync(self)
+            index.vacuum()
+        finally:
+            index.close()
+        
+        after = os.path.getsize(self.cache_file) if os.path.exists(self.cache_file) else 0
+        self.logger.info(f"Vacuumed cache from {before} to {after} bytes")
+        return {'before_bytes': before, 'after_bytes': after}
+    
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over cache entries one at a time.
+        
+        Returns:
+            Iterator of cache entry dictionaries
+        """
+        for key in self.cache_data:
+            entry = self.cache_data.get(key)
+            if entry is not None:
+                yield entry
+    
+    def _expired_keys(self) -> List[str]:
+        """
+        Find expired cache keys.
+        
+        Returns:
+            List of keys whose entries are expired
+        """
+        if self.storage == "binary":
+            # Timestamps live in the record headers, so nothing is decoded
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).timestamp()
+            return [key for key in self.cache_data if self.cache_data.timestamp(key) < cutoff]
+        return [key for key, entry in self.cache_data.items() if self._is_expired(entry)]
+    
+    def cache_key(self, error_text: str) -> str:
+        """
+        Get the key an error is cached under.
+        
+        Args:
+            error_text: The error text
+            
+        Returns:
+            Cache key
+        """
+        return self._hash_error(error_text)
+    
+    def fingerprint_key(self, error_text: str) -> str:
+        """
+        Get the key an error is cached under when saved by fingerprint.
+        
+        Args:
+            error_text: The error text
+            
+        Returns:
+            SHA-256 hash of the normalized error (see utils.fingerprint)
+        """
+        return self._hash_error(normalize_error(error_text))
     
     def _hash_error(self, error_text: str) -> str:
         """
@@ -171,24 +476,112 @@ class ErrorCache:
         Load cache from file.
         
         Returns:
-            Cache data dictionary
+            Cache data dictionary (a CompressedStore for binary storage)
+        """
+        if self.storage == "binary":
+            try:
+                return CompressedStore(self.store_file)
+            except (ValueError, IOError) as e:
+                # Never clobber an unreadable store; fall back to JSON
+                self.logger.warning(f"Failed to open compressed cache, using JSON: {e}")
+                self.storage = "json"
+                self.cache_file = self.json_file
+        
+        with file_lock(self.cache_file, shared=True):
+            data = self._read_json()
+        self.logger.info(f"Loaded cache with {len(data)} entries")
+        return _TrackedDict(data)
+    
+    def _import_legacy_cache(self):
         """
+        Bring in a cache left at the old default location, ./history.
+        
+        Each old file is imported once (its path is remembered in the cache
+        directory) and left in place; entries already cached take precedence.
+        """
+        legacy_file = os.path.abspath(os.path.join(LEGACY_CACHE_DIR, "error_logs.json"))
+        if not os.path.isfile(legacy_file) or os.path.dirname(legacy_file) == os.path.abspath(self.cache_dir):
+            return
+        
+        marker_file = os.path.join(self.cache_dir, "legacy_imported.json")
+        with file_lock(marker_file):
+            try:
+                with open(marker_file, 'r', encoding='utf-8') as f:
+                    imported = json.load(f)
+            except (IOError, ValueError):
+                imported = []
+            if legacy_file in imported:
+                return
+            
+            try:
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                entries = {key: entry for key, entry in legacy.items()
+                           if isinstance(entry, dict) and key not in self.cache_data}
+            except (json.JSONDecodeError, IOError, AttributeError) as e:
+                self.logger.warning(f"Could not import the old cache at {legacy_file}: {e}")
+                entries = None
+            if entries:
+                self.cache_data.update(entries)
+                self._save_cache()
+            
+            imported.append(legacy_file)
+            try:
+                with open(marker_file, 'w', encoding='utf-8') as f:
+                    json.dump(imported, f)
+            except IOError:
+                pass
+        
+        if entries is not None:
+            self.logger.warning(f"Imported {len(entries)} cached explanations from the old location {legacy_file} "
+                                f"into {self.cache_dir}; the old file can be deleted")
+    
+    def _read_json(self) -> Dict[str, Any]:
+        """Read the JSON cache file; call with the file lock held."""
         try:
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.logger.info(f"Loaded cache with {len(data)} entries")
-                    return data
+                    self._disk_state = self._stat_json()
+                    return json.load(f)
         except (json.JSONDecodeError, IOError) as e:
             self.logger.warning(f"Failed to load cache: {e}")
-        
         return {}
     
+    def _stat_json(self):
+        try:
+            stat = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
+    def _refresh_json(self) -> bool:
+        """Merge in entries other processes saved; True if the file had changed."""
+        if self._stat_json() == self._disk_state:
+            return False
+        with file_lock(self.cache_file, shared=True):
+            data = self.cache_data.merged_into(self._read_json())
+        pending = self.cache_data
+        self.cache_data = _TrackedDict(data)
+        # Keep unsaved changes marked as such
+        self.cache_data.changed, self.cache_data.removed = pending.changed, pending.removed
+        self.cache_data.cleared = pending.cleared
+        return True
+    
     def _save_cache(self):
-        """Save cache to file."""
+        """Save cache to file, merging in entries other processes saved meanwhile."""
+        if self.storage == "binary":
+            # The compressed store appends each change as it happens
+            return
+        
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
+            with file_lock(self.cache_file):
+                data = self.cache_data.merged_into(self._read_json())
+                tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_file)
+                self._disk_state = self._stat_json()
+            self.cache_data = _TrackedDict(data)
         except IOError as e:
             self.logger.error(f"Failed to save cache: {e}")
     
@@ -201,7 +594,7 @@ class ErrorCache:
         """
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
+                json.dump(dict(self.cache_data), f, indent=2, ensure_ascii=False)
             self.logger.info(f"Exported cache to {output_file}")
         except IOError as e:
             self.logger.error(f"Failed to export cache: {e}")
@@ -222,4 +615,63 @@ class ErrorCache:
             self._save_cache()
             self.logger.info(f"Imported {len(imported_data)} entries from {input_file}")
         except (json.JSONDecodeError, IOError) as e:
-            self.logger.error(f"Failed to import cache: {e}") 
\ No newline at end of file
+            self.logger.error(f"Failed to import cache: {e}")
+    
+    def export_jsonl(self, output: TextIO) -> int:
+        """
+        Stream cache entries to a JSON Lines file.
+        
+        Args:
+            output: Text stream to write to
+            
+        Returns:
+            Number of entries exported
+        """
+        count = 0
+        for entry in self.iter_entries():
+            output.write(json.dumps(entry, ensure_ascii=False))
+            output.write("\n")
+            count += 1
+        self.logger.info(f"Exported {count} entries")
+        return count
+    
+    def import_jsonl(self, source: TextIO, batch_size: int = 10000) -> int:
+        """
+        Stream cache entries from a JSON Lines file.
+        
+        Entries are written in batches, so memory stays bounded by the batch
+        size rather than the file size (compressed storage).
+        
+        Args:
+            source: Text stream to read from
+            batch_size: Number of entries per write
+            
+        Returns:
+            Number of entries imported
+        """
+        count = 0
+        batch = {}
+        for line_number, line in enumerate(source, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+                key = entry.get('hash') or self._hash_error(entry['error_text'])
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                self.logger.warning(f"Skipping invalid entry on line {line_number}: {e}")
+                continue
+            
+            batch[key] = entry
+            if len(batch) >= batch_size:
+                self.cache_data.update(batch)
+                count += len(batch)
+                batch = {}
+        
+        if batch:
+            self.cache_data.update(batch)
+            count += len(batch)
+        
+        self._save_cache()
+        self.logger.info(f"Imported {count} entries")
+        return count
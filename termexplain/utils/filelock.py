@@ -0,0 +1,41 @@
+"""
+File Locking for termExplain
+
+Advisory locks for files that several termExplain processes update, such as
+the cache store and the statistics files. Locks are taken on a separate
+``.lock`` file, so they still hold when the data file itself is replaced
+with os.replace. On platforms without fcntl the lock is a no-op.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """
+    Hold an advisory lock for a file.
+
+    Args:
+        path: The data file to lock (the lock is taken on path + ".lock")
+        shared: Take a shared (read) lock instead of an exclusive one
+
+    Yields:
+        None, with the lock held
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = os.open(f"{path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
@@ -0,0 +1,55 @@
+"""
+Error Fingerprinting for termExplain
+
+Normalizes error text so that repeats of the same failure (differing only in
+timestamps, addresses, ids or line numbers) share one fingerprint.
+"""
+
+import hashlib
+import re
+
+# Order matters: more specific patterns run first
+NORMALIZATION_PATTERNS = [
+    # ISO-8601 / syslog style timestamps
+    (re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"\b[A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2}\b"), "<ts>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<ts>"),
+    # UUIDs and hex addresses / hashes
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), "<uuid>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.IGNORECASE), "<addr>"),
+    (re.compile(r"\b[0-9a-f]{12,}\b", re.IGNORECASE), "<hex>"),
+    # Temporary paths differ on every run
+    (re.compile(r"/tmp/[^\s:'\"]+"), "<tmp>"),
+    # Remaining numbers: line numbers, pids, ports, counts
+    (re.compile(r"\d+"), "<n>"),
+]
+
+WHITESPACE = re.compile(r"[ \t]+")
+
+def normalize_error(error_text: str) -> str:
+    """
+    Normalize error text for fingerprinting.
+
+    Args:
+        error_text: Raw error text
+
+    Returns:
+        Text with volatile tokens replaced by placeholders
+    """
+    text = error_text.strip()
+    for pattern, replacement in NORMALIZATION_PATTERNS:
+        text = pattern.sub(replacement, text)
+    lines = (WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+def fingerprint(error_text: str) -> str:
+    """
+    Fingerprint an error.
+
+    Args:
+        error_text: Raw error text
+
+    Returns:
+        Short hex digest of the normalized text
+    """
+    return hashlib.sha256(normalize_error(error_text).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,456 @@
+"""
+Log Following for termExplain
+
+Tails growing log files, reading only newly appended bytes, and turns them
+into complete error records (tracebacks, stack traces, error lines) as they
+land. Uses inotify on Linux and falls back to stat polling elsewhere.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from termexplain.utils.fingerprint import fingerprint
+
+# inotify flags (from <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Distinct fingerprints remembered by the rate limiter and the occurrence counts;
+# the least recently seen are forgotten first
+MAX_TRACKED_ERRORS = 10000
+
+PYTHON_TRACEBACK = re.compile(r"Traceback \(most recent call last\):")
+PYTHON_CHAINED = re.compile(r"^(During handling of the above exception|The above exception was the direct cause)")
+STACK_FRAME = re.compile(r"^\s+(at |File \"|\.\.\. \d+ more)")
+ERROR_LINE = re.compile(
+    r"\b(error|exception|fatal|panic|traceback|segmentation fault|killed)\b|^\w+(Error|Exception)\b",
+    re.IGNORECASE,
+)
+
+class FileWatcher:
+    """Waits for changes to a set of files, via inotify where available."""
+
+    def __init__(self, paths: Iterable[str], poll_interval: float = 0.5):
+        """
+        Initialize the watcher.
+
+        Args:
+            paths: Files to watch (they need not exist yet)
+            poll_interval: Seconds between checks when polling
+        """
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        self._fd = self._init_inotify()
+
+    def _init_inotify(self) -> Optional[int]:
+        """Set up inotify watches on the parent directories, or return None."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            # Watching directories also catches rotation and late creation
+            mask = IN_MODIFY | IN_ATTRIB | IN_CREATE | IN_MOVED_TO
+            for directory in {os.path.dirname(p) for p in self.paths}:
+                if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                    os.close(fd)
+                    return None
+            return fd
+        except (OSError, AttributeError) as e:
+            self.logger.info(f"inotify unavailable, polling instead: {e}")
+            return None
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether changes are reported by inotify rather than polling."""
+        return self._fd is not None
+
+    def wait(self, timeout: float):
+        """
+        Block until a watched file may have changed or the timeout passes.
+
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        if self._fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if ready:
+            try:
+                # Drain the queue; which file changed doesn't matter
+                while os.read(self._fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        """Release the inotify descriptor."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class LogFollower:
+    """Reads newly appended lines from one file, surviving rotation and truncation."""
+
+    def __init__(self, path: str, from_start: bool = False, max_read: int = 1024 * 1024):
+        """
+        Initialize the follower.
+
+        Args:
+            path: File to follow
+            from_start: Read existing content instead of starting at the end
+            max_read: Maximum bytes to read per poll
+        """
+        self.path = path
+        self.max_read = max_read
+        self.offset = 0
+        self.inode = None
+        self._partial = b""
+
+        if not from_start and os.path.exists(path):
+            stat = os.stat(path)
+            self.offset = stat.st_size
+            self.inode = stat.st_ino
+
+    def read_lines(self) -> List[str]:
+        """
+        Read complete lines appended since the last call.
+
+        Returns:
+            New lines without trailing newlines
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            # Rotated or truncated: start over from the beginning
+            self.inode = stat.st_ino
+            self.offset = 0
+            self._partial = b""
+
+        if stat.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(self.max_read)
+        self.offset += len(data)
+
+        data = self._partial + data
+        lines = data.split(b"\n")
+        # The last piece is an unfinished line; keep it for next time
+        self._partial = lines.pop()
+        return [line.rstrip(b"\r").decode("utf-8", errors="replace") for line in lines]
+
+class ErrorRecordDetector:
+    """Groups log lines into complete error records incrementally."""
+
+    def __init__(self, idle_seconds: float = 1.0, max_lines: int = 200):
+        """
+        Initialize the detector.
+
+        Args:
+            idle_seconds: Close an open record after this long without new lines
+            max_lines: Maximum lines kept per record
+        """
+        self.idle_seconds = idle_seconds
+        self.max_lines = max_lines
+        self._lines: List[str] = []
+        self._in_traceback = False
+        self._last_line_time = 0.0
+        # 1-based line numbers, for reporting where records came from
+        self.lines_fed = 0
+        self._start_line = 0
+        self.last_record_line = 0
+
+    def feed(self, line: str, now: Optional[float] = None) -> List[str]:
+        """
+        Feed one line.
+
+        Args:
+            line: Log line
+            now: Current time (default: time.monotonic())
+
+        Returns:
+            Records completed by this line
+        """
+        now = time.monotonic() if now is None else now
+        completed = []
+        self.lines_fed += 1
+
+        if self._lines:
+            if self._continues(line):
+                if len(self._lines) < self.max_lines:
+                    self._lines.append(line)
+                if PYTHON_TRACEBACK.search(line):
+                    self._in_traceback = True
+                self._last_line_time = now
+                return completed
+            if self._in_traceback:
+                # The exception line that ends a Python traceback; stay open
+                # in case a chained traceback follows
+                self._lines.append(line)
+                self._in_traceback = False
+                self._last_line_time = now
+                return completed
+            completed.append(self._close())
+
+        if PYTHON_TRACEBACK.search(line) or ERROR_LINE.search(line):
+            self._lines = [line]
+            self._start_line = self.lines_fed
+            self._in_traceback = bool(PYTHON_TRACEBACK.search(line))
+            self._last_line_time = now
+
+        return completed
+
+    def flush_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        Close the open record if no lines arrived for idle_seconds.
+
+        Args:
+            now: Current time (default: time.monotonic())
+
+        Returns:
+            The closed record, if any
+        """
+        now = time.monotonic() if now is None else now
+        if self._lines and now - self._last_line_time >= self.idle_seconds:
+            return [self._close()]
+        return []
+
+    def _continues(self, line: str) -> bool:
+        """Whether a line belongs to the open record."""
+        if STACK_FRAME.match(line) or PYTHON_TRACEBACK.search(line) or PYTHON_CHAINED.match(line):
+            return True
+        # Blank separators and indented detail lines (source, context)
+        return not line.strip() or line[:1].isspace()
+
+    def _close(self) -> str:
+        record = "\n".join(self._lines).strip()
+        self.last_record_line = self._start_line
+        self._lines = []
+        self._in_traceback = False
+        return record
+
+class RateLimiter:
+    """Explains each fingerprint at most once per window, within a global budget."""
+
+    def __init__(self, window_seconds: float = 300.0, max_per_minute: int = 10,
+                 max_keys: int = MAX_TRACKED_ERRORS):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            window_seconds: Minimum seconds between explanations of one error
+            max_per_minute: Maximum explanations per minute across all errors
+            max_keys: Most fingerprints remembered at once
+        """
+        self.window_seconds = window_seconds
+        self.max_per_minute = max_per_minute
+        self.max_keys = max_keys
+        # Oldest explanation first, so expired entries are pruned from the front
+        self._last_explained: "OrderedDict[str, float]" = OrderedDict()
+        self._recent: deque = deque()
+
+    def allow(self, key: str, now: Optional[float] = None) -> bool:
+        """
+        Decide whether an error may be explained now.
+
+        Args:
+            key: Error fingerprint
+            now: Current time (default: time.monotonic())
+
+        Returns:
+            True if the caller should explain the error
+        """
+        now = time.monotonic() if now is None else now
+        while self._last_explained:
+            oldest_key, oldest = next(iter(self._last_explained.items()))
+            if now - oldest < self.window_seconds:
+                break
+            del self._last_explained[oldest_key]
+
+        last = self._last_explained.get(key)
+        if last is not None and now - last < self.window_seconds:
+            return False
+
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.max_per_minute:
+            return False
+
+        self._last_explained[key] = now
+        self._last_explained.move_to_end(key)
+        if len(self._last_explained) > self.max_keys:
+            self._last_explained.popitem(last=False)
+        self._recent.append(now)
+        return True
+
+def follow_errors(
+    paths: Iterable[str],
+    on_error: Callable[[str, str, int], None],
+    window_seconds: float = 300.0,
+    max_per_minute: int = 10,
+    debounce_seconds: float = 1.0,
+    from_start: bool = False,
+    should_stop: Callable[[], bool] = lambda: False,
+):
+    """
+    Follow log files and report each new unique error record.
+
+    Records are held for debounce_seconds so a burst of identical errors
+    collapses into one report, then passed through the rate limiter.
+
+    Args:
+        paths: Log files to follow
+        on_error: Called with (record, fingerprint, occurrences since last report)
+        window_seconds: Minimum seconds between reports of one error
+        max_per_minute: Maximum reports per minute across all errors
+        debounce_seconds: Quiet period before a record is reported
+        from_start: Process existing file content too
+        should_stop: Polled between waits; return True to stop following
+    """
+    paths = list(paths)
+    watcher = FileWatcher(paths)
+    followers = [LogFollower(p, from_start=from_start) for p in paths]
+    detectors = [ErrorRecordDetector(idle_seconds=debounce_seconds) for _ in paths]
+    limiter = RateLimiter(window_seconds, max_per_minute)
+    # fingerprint -> (first record, first seen)
+    pending: Dict[str, Tuple[str, float]] = {}
+    # fingerprint -> [occurrences not yet reported, last seen], least recently seen first
+    unreported: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    try:
+        while not should_stop():
+            now = time.monotonic()
+            for follower, detector in zip(followers, detectors):
+                records = []
+                for line in follower.read_lines():
+                    records.extend(detector.feed(line, now))
+                records.extend(detector.flush_idle(now))
+
+                for record in records:
+                    key = fingerprint(record)
+                    pending.setdefault(key, (record, now))
+                    counts = unreported.setdefault(key, [0, now])
+                    counts[0] += 1
+                    counts[1] = now
+                    unreported.move_to_end(key)
+
+            for key, (record, seen) in list(pending.items()):
+                if now - seen < debounce_seconds:
+                    continue
+                del pending[key]
+                if limiter.allow(key, now):
+                    on_error(record, key, int(unreported.pop(key)[0]))
+
+            # Suppressed errors that stopped occurring would otherwise be counted forever
+            while unreported:
+                key, (_, seen) = next(iter(unreported.items()))
+                if now - seen < window_seconds and len(unreported) <= MAX_TRACKED_ERRORS:
+                    break
+                if key in pending:
+                    unreported.move_to_end(key)
+                    break
+                del unreported[key]
+
+            watcher.wait(debounce_seconds / 2)
+    finally:
+        watcher.close()
+
+# Sources whose changes re-run a watched script, by the script's extension
+SOURCE_EXTENSIONS = {
+    '.py': ('.py',),
+    '.js': ('.js', '.mjs', '.cjs', '.json'),
+    '.mjs': ('.js', '.mjs', '.cjs', '.json'),
+}
+
+def sibling_sources(file_path: str) -> List[str]:
+    """
+    List a script and the source files next to it.
+
+    Args:
+        file_path: Script being watched
+
+    Returns:
+        Absolute paths of the script and its same-language siblings
+    """
+    file_path = os.path.abspath(file_path)
+    directory = os.path.dirname(file_path)
+    extensions = SOURCE_EXTENSIONS.get(os.path.splitext(file_path)[1].lower(), ())
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        names = []
+    siblings = {os.path.join(directory, name) for name in names
+                if os.path.splitext(name)[1].lower() in extensions}
+    siblings.add(file_path)
+    return sorted(siblings)
+
+def source_snapshot(paths: Iterable[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+    """Modification time and size of each path (None if missing)."""
+    snapshot: Dict[str, Optional[Tuple[int, int]]] = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            snapshot[path] = None
+    return snapshot
+
+def wait_for_source_change(file_path: str, watcher: FileWatcher, debounce_seconds: float = 0.3,
+                           should_stop: Callable[[], bool] = lambda: False) -> List[str]:
+    """
+    Block until a script or one of its sibling sources changes, then settles.
+
+    Editors often write a file in several steps; the change is reported once
+    nothing has changed for debounce_seconds.
+
+    Args:
+        file_path: Script being watched
+        watcher: FileWatcher on the script's path
+        debounce_seconds: Quiet period after the last change
+        should_stop: Polled between waits; return True to stop waiting
+
+    Returns:
+        Paths that changed, were created or were removed (empty if stopped)
+    """
+    before = source_snapshot(sibling_sources(file_path))
+    current = before
+    while not should_stop():
+        watcher.wait(1.0)
+        # The watcher wakes for anything in the directory; compare to be sure
+        current = source_snapshot(sibling_sources(file_path))
+        if current != before:
+            break
+    else:
+        return []
+
+    settled = current
+    while True:
+        time.sleep(debounce_seconds)
+        latest = source_snapshot(sibling_sources(file_path))
+        if latest == settled:
+            break
+        settled = latest
+
+    return sorted(path for path in set(before) | set(settled) if before.get(path) != settled.get(path))
@@ -118,6 +118,18 @@ class OutputFormatter:
         self.console.print(explanation)
         self.console.print("="*60 + "\n")
     
+    def parse_sections(self, explanation: str) -> list:
+        """
+        Split an explanation into its what/why/how sections.
+        
+        Args:
+            explanation: Raw explanation text
+            
+        Returns:
+            List of section dictionaries with type, title and content
+        """
+        return self._parse_explanation(explanation)
+    
     def _parse_explanation(self, explanation: str) -> list:
         """
         Parse the explanation into structured sections.
@@ -220,6 +232,19 @@ class OutputFormatter:
         else:
             self.console.print(f"SUCCESS: {message}")
     
+    def display_warning(self, message: str):
+        """
+        Display a warning message with formatting.
+        
+        Args:
+            message: The warning message
+        """
+        if self.pretty:
+            warning_text = Text(f"⚠️  {message}", style="bold yellow")
+            self.console.print(Panel(warning_text, border_style="yellow"))
+        else:
+            self.console.print(f"WARNING: {message}")
+    
     def display_info(self, message: str):
         """
         Display an info message with formatting.
@@ -0,0 +1,125 @@
+"""
+Shared Cache Server for termExplain
+
+A small in-memory key-value server speaking the memcached text protocol
+subset that RemoteCache uses (get, set, delete, version). Real memcached
+works as the shared tier too; this stand-in is for local use and tests.
+
+Usage:
+    python -m termexplain.utils.kvserver --port 11211
+"""
+
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import click
+
+class KeyValueStore:
+    """Thread-safe LRU dictionary with per-key expiry."""
+
+    def __init__(self, max_items: int = 100000):
+        """
+        Initialize the store.
+
+        Args:
+            max_items: Maximum number of keys kept (least recently used are evicted)
+        """
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires and time.time() > expires:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int = 0):
+        with self._lock:
+            self._items[key] = (value, time.time() + ttl if ttl else 0.0)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._items.pop(key, None) is not None
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serves memcached text protocol commands on one connection."""
+
+    def handle(self):
+        store: KeyValueStore = self.server.store
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode("utf-8", errors="replace").split()
+            if not parts:
+                continue
+            command = parts[0].lower()
+
+            if command == "get" and len(parts) >= 2:
+                out = []
+                for key in parts[1:]:
+                    value = store.get(key)
+                    if value is not None:
+                        out.append(f"VALUE {key} 0 {len(value)}\r\n".encode() + value + b"\r\n")
+                self.wfile.write(b"".join(out) + b"END\r\n")
+            elif command == "set" and len(parts) >= 5:
+                key, ttl, length = parts[1], int(parts[3]), int(parts[4])
+                value = self.rfile.read(length + 2)[:length]
+                store.set(key, value, ttl)
+                if parts[-1] != "noreply":
+                    self.wfile.write(b"STORED\r\n")
+            elif command == "delete" and len(parts) >= 2:
+                self.wfile.write(b"DELETED\r\n" if store.delete(parts[1]) else b"NOT_FOUND\r\n")
+            elif command == "version":
+                self.wfile.write(b"VERSION termexplain-kv\r\n")
+            elif command == "quit":
+                return
+            else:
+                self.wfile.write(b"ERROR\r\n")
+
+class KeyValueServer(socketserver.ThreadingTCPServer):
+    """Threaded TCP server holding one KeyValueStore."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 11211, max_items: int = 100000):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            max_items: Maximum number of stored keys
+        """
+        self.store = KeyValueStore(max_items)
+        super().__init__((host, port), _Handler)
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to bind')
+@click.option('--port', default=11211, show_default=True, help='Port to listen on')
+@click.option('--max-items', default=100000, show_default=True, help='Maximum number of stored keys')
+def main(host, port, max_items):
+    """Run a shared cache server for termExplain."""
+    with KeyValueServer(host, port, max_items) as server:
+        click.echo(f"Shared cache listening on {host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
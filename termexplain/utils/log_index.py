@@ -0,0 +1,372 @@
+"""
+Log Fingerprint Index for termExplain
+
+Scans archived logs (plain or gzip-compressed) in parallel worker processes,
+groups the error records they contain by fingerprint, and keeps counts,
+first/last sighting and sample locations in a SQLite file next to the cache.
+Answers "which errors recur, and how often" without touching the logs again,
+and tells cache warm-up which errors are worth explaining first.
+
+Work is split per file, which suits CI archives made of many logs. Files
+whose size and modification time haven't changed since the last scan are
+skipped.
+"""
+
+import gzip
+import mmap
+import os
+import re
+import sqlite3
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from termexplain.utils.fingerprint import fingerprint
+from termexplain.utils.follow import ErrorRecordDetector
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL,
+                                  records INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS file_errors (path TEXT NOT NULL, fingerprint TEXT NOT NULL, count INTEGER NOT NULL,
+                                        first_seen REAL NOT NULL, last_seen REAL NOT NULL,
+                                        PRIMARY KEY (path, fingerprint));
+CREATE INDEX IF NOT EXISTS file_errors_fingerprint ON file_errors (fingerprint);
+CREATE TABLE IF NOT EXISTS locations (fingerprint TEXT NOT NULL, path TEXT NOT NULL, line INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS locations_fingerprint ON locations (fingerprint);
+CREATE INDEX IF NOT EXISTS locations_path ON locations (path);
+CREATE TABLE IF NOT EXISTS samples (fingerprint TEXT PRIMARY KEY, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS errors (fingerprint TEXT PRIMARY KEY, count INTEGER NOT NULL, files INTEGER NOT NULL,
+                                   first_seen REAL NOT NULL, last_seen REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS errors_count ON errors (count DESC);
+CREATE INDEX IF NOT EXISTS errors_last_seen ON errors (last_seen);
+"""
+
+# Leading timestamp of a log line, e.g. "2024-05-01T12:00:03Z" or "2024-05-01 12:00:03,123"
+LINE_TIMESTAMP = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})")
+
+# Locations kept per fingerprint and file
+MAX_LOCATIONS = 5
+MAX_SAMPLE_CHARS = 4000
+
+def iter_log_lines(path: str) -> Iterator[str]:
+    """
+    Iterate over the lines of a log file.
+
+    Plain files are memory-mapped; gzip files are decompressed as a stream.
+
+    Args:
+        path: Log file
+
+    Yields:
+        Lines without their line endings
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            for raw in f:
+                yield raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        return
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b""):
+                yield raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+def record_time(record: str, default: float) -> float:
+    """Timestamp at the start of a record, or default if it has none."""
+    match = LINE_TIMESTAMP.search(record[:200])
+    if match:
+        try:
+            return datetime.strptime(f"{match.group(1)} {match.group(2)}", "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            pass
+    return default
+
+def scan_log_file(path: str) -> Tuple[str, int, float, int, Dict[str, Dict[str, Any]]]:
+    """
+    Extract and fingerprint the error records in one log file.
+
+    Runs in a worker process.
+
+    Args:
+        path: Log file
+
+    Returns:
+        tuple: (path, size, mtime, record count, per-fingerprint summary with
+        count, first_seen, last_seen, sample and lines)
+    """
+    stat = os.stat(path)
+    detector = ErrorRecordDetector(max_lines=200)
+    found: Dict[str, Dict[str, Any]] = {}
+    total = 0
+
+    def add(records: List[str]):
+        nonlocal total
+        for record in records:
+            total += 1
+            seen = record_time(record, stat.st_mtime)
+            key = fingerprint(record)
+            entry = found.get(key)
+            if entry is None:
+                found[key] = {'count': 1, 'first_seen': seen, 'last_seen': seen,
+                              'sample': record[:MAX_SAMPLE_CHARS], 'lines': [detector.last_record_line]}
+                continue
+            entry['count'] += 1
+            entry['first_seen'] = min(entry['first_seen'], seen)
+            entry['last_seen'] = max(entry['last_seen'], seen)
+            if len(entry['lines']) < MAX_LOCATIONS:
+                entry['lines'].append(detector.last_record_line)
+
+    # Archived logs aren't growing: a record ends at the next unrelated line,
+    # never on a timer
+    for line in iter_log_lines(path):
+        add(detector.feed(line, now=0.0))
+    add(detector.flush_idle(now=float("inf")))
+
+    return path, stat.st_size, stat.st_mtime, total, found
+
+def expand_paths(paths: Iterable[str]) -> List[str]:
+    """
+    Expand directories into the files below them.
+
+    Args:
+        paths: Files and directories
+
+    Returns:
+        Sorted absolute file paths
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.update(os.path.abspath(os.path.join(root, name)) for name in names)
+        elif os.path.isfile(path):
+            files.add(os.path.abspath(path))
+    return sorted(files)
+
+class LogIndex:
+    """Persistent index of error fingerprints found in log archives."""
+
+    def __init__(self, cache_dir: str):
+        """
+        Open or create the index.
+
+        Args:
+            cache_dir: Cache directory the index lives in
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "log_index.sqlite3")
+        self.logger = logging.getLogger(__name__)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def scan(self, paths: Iterable[str], workers: Optional[int] = None,
+             on_file: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """
+        Scan log files and directories into the index.
+
+        Args:
+            paths: Files and directories to scan
+            workers: Worker processes (default: one per CPU)
+            on_file: Called with (path, records found) as each file finishes
+
+        Returns:
+            Dictionary with files_scanned, files_unchanged, files_failed and records
+        """
+        known = {row['path']: (row['size'], row['mtime'])
+                 for row in self.conn.execute("SELECT path, size, mtime FROM files")}
+        todo = []
+        unchanged = 0
+        for path in expand_paths(paths):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if known.get(path) == (stat.st_size, stat.st_mtime):
+                unchanged += 1
+            else:
+                todo.append(path)
+
+        stats = {'files_scanned': 0, 'files_unchanged': unchanged, 'files_failed': 0, 'records': 0}
+        if not todo:
+            return stats
+
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(scan_log_file, path): path for path in todo}
+            for future in as_completed(futures):
+                try:
+                    path, size, mtime, records, found = future.result()
+                except (OSError, EOFError, zlib.error) as e:
+                    self.logger.warning(f"Could not scan {futures[future]}: {e}")
+                    stats['files_failed'] += 1
+                    continue
+                # Results are written as they arrive, so an interrupted scan keeps its progress
+                self._apply_file(path, size, mtime, records, found)
+                stats['files_scanned'] += 1
+                stats['records'] += records
+                if on_file:
+                    on_file(path, records)
+
+        self.conn.execute("DELETE FROM samples WHERE fingerprint NOT IN (SELECT fingerprint FROM errors)")
+        self.conn.commit()
+        return stats
+
+    def top(self, limit: int = 20, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most frequent errors.
+
+        Args:
+            limit: Maximum number of errors
+            since: Only errors seen at or after this Unix time (optional)
+
+        Returns:
+            Error summaries ordered by count
+        """
+        query = ("SELECT e.fingerprint, e.count, e.files, e.first_seen, e.last_seen, s.text AS sample "
+                 "FROM errors e JOIN samples s USING (fingerprint)")
+        params: Tuple = ()
+        if since is not None:
+            query += " WHERE e.last_seen >= ?"
+            params = (since,)
+        query += " ORDER BY e.count DESC, e.last_seen DESC LIMIT ?"
+        return [dict(row) for row in self.conn.execute(query, params + (limit,))]
+
+    def get(self, fingerprint_prefix: str, max_locations: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        Get one error with its sample locations.
+
+        Args:
+            fingerprint_prefix: Fingerprint or a unique prefix of one
+            max_locations: Maximum number of locations returned
+
+        Returns:
+            Error summary with a locations list of (path, line), or None
+        """
+        if not re.fullmatch(r"[0-9a-f]{1,16}", fingerprint_prefix):
+            return None
+        rows = self.conn.execute(
+            "SELECT e.fingerprint, e.count, e.files, e.first_seen, e.last_seen, s.text AS sample "
+            "FROM errors e JOIN samples s USING (fingerprint) WHERE e.fingerprint GLOB ? LIMIT 2",
+            (fingerprint_prefix + "*",),
+        ).fetchall()
+        if len(rows) != 1:
+            return None
+
+        entry = dict(rows[0])
+        entry['locations'] = [
+            (row['path'], row['line']) for row in self.conn.execute(
+                "SELECT path, line FROM locations WHERE fingerprint = ? ORDER BY path, line LIMIT ?",
+                (entry['fingerprint'], max_locations),
+            )
+        ]
+        return entry
+
+    def lookup(self, error_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the index entry for an error text, by its fingerprint.
+
+        Args:
+            error_text: The error text
+
+        Returns:
+            Error summary, or None if it was never seen in the logs
+        """
+        return self.get(fingerprint(error_text))
+
+    def warmup_candidates(self, cache, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Pick the errors most worth explaining ahead of time.
+
+        The most frequent errors come first; those whose sample already has
+        a cached explanation are skipped.
+
+        Args:
+            cache: ErrorCache or TieredCache to check
+            limit: Maximum number of candidates
+
+        Returns:
+            Error summaries ordered by priority
+        """
+        candidates = []
+        offset = 0
+        while len(candidates) < limit:
+            rows = self.conn.execute(
+                "SELECT e.fingerprint, e.count, e.files, e.first_seen, e.last_seen, s.text AS sample "
+                "FROM errors e JOIN samples s USING (fingerprint) "
+                "ORDER BY e.count DESC, e.last_seen DESC LIMIT ? OFFSET ?",
+                (limit * 2, offset),
+            ).fetchall()
+            if not rows:
+                break
+            offset += len(rows)
+            for row in rows:
+                if cache.get(row['sample']) is None:
+                    candidates.append(dict(row))
+                    if len(candidates) == limit:
+                        break
+        return candidates
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics.
+
+        Returns:
+            Dictionary with file, record and fingerprint counts
+        """
+        files, records = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(records), 0) FROM files").fetchone()
+        fingerprints = self.conn.execute("SELECT COUNT(*) FROM errors").fetchone()[0]
+        return {
+            'files': files,
+            'records': records,
+            'fingerprints': fingerprints,
+            'index_file': self.path,
+            'index_size_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        """Close the index."""
+        self.conn.close()
+
+    def _apply_file(self, path: str, size: int, mtime: float, records: int, found: Dict[str, Dict[str, Any]]):
+        """Replace one file's contribution to the index and refresh the affected totals."""
+        with self.conn:
+            affected = {row[0] for row in self.conn.execute(
+                "SELECT fingerprint FROM file_errors WHERE path = ?", (path,))}
+            affected.update(found)
+            self.conn.execute("DELETE FROM file_errors WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM locations WHERE path = ?", (path,))
+
+            self.conn.executemany(
+                "INSERT INTO file_errors (path, fingerprint, count, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)",
+                ((path, key, e['count'], e['first_seen'], e['last_seen']) for key, e in found.items()),
+            )
+            self.conn.executemany(
+                "INSERT INTO locations (fingerprint, path, line) VALUES (?, ?, ?)",
+                ((key, path, line) for key, e in found.items() for line in e['lines']),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO samples (fingerprint, text) VALUES (?, ?)",
+                ((key, e['sample']) for key, e in found.items()),
+            )
+
+            affected_keys = list(affected)
+            for i in range(0, len(affected_keys), 500):
+                batch = affected_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                self.conn.execute(f"DELETE FROM errors WHERE fingerprint IN ({placeholders})", batch)
+                self.conn.execute(
+                    f"INSERT INTO errors (fingerprint, count, files, first_seen, last_seen) "
+                    f"SELECT fingerprint, SUM(count), COUNT(*), MIN(first_seen), MAX(last_seen) "
+                    f"FROM file_errors WHERE fingerprint IN ({placeholders}) GROUP BY fingerprint",
+                    batch,
+                )
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, records) VALUES (?, ?, ?, ?)",
+                (path, size, mtime, records),
+            )
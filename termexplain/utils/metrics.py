@@ -0,0 +1,111 @@
+"""
+Metrics for termExplain
+
+Lightweight counters and latency histograms for long-running modes.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+DEFAULT_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        """
+        Initialize the histogram.
+
+        Args:
+            buckets_ms: Bucket upper bounds in milliseconds
+        """
+        self.buckets_ms = list(buckets_ms or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """
+        Record one latency.
+
+        Args:
+            seconds: Observed latency in seconds
+        """
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+            self.total += 1
+            self.sum_ms += ms
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Estimate a percentile from the buckets.
+
+        Args:
+            fraction: Percentile as a fraction (0.99 for p99)
+
+        Returns:
+            Bucket upper bound containing the percentile, in milliseconds
+        """
+        with self._lock:
+            if not self.total:
+                return 0.0
+            target = fraction * self.total
+            seen = 0
+            for bound, count in zip(self.buckets_ms + [float("inf")], self.counts):
+                seen += count
+                if seen >= target:
+                    return bound if bound != float("inf") else self.buckets_ms[-1]
+        return self.buckets_ms[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the histogram."""
+        with self._lock:
+            buckets = {f"le_{bound:g}ms": count for bound, count in zip(self.buckets_ms, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            total, sum_ms = self.total, self.sum_ms
+        return {
+            'count': total,
+            'mean_ms': round(sum_ms / total, 2) if total else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': buckets,
+        }
+
+class RateCounter:
+    """Counts events over a sliding window."""
+
+    def __init__(self, window_seconds: float = 60.0):
+        """
+        Initialize the counter.
+
+        Args:
+            window_seconds: Window length in seconds
+        """
+        self.window_seconds = window_seconds
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+
+    def mark(self):
+        """Record one event now."""
+        now = time.monotonic()
+        with self._lock:
+            self._events.append(now)
+            self._trim(now)
+
+    def per_second(self) -> float:
+        """Events per second over the window."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return round(len(self._events) / self.window_seconds, 3)
+
+    def _trim(self, now: float):
+        while self._events and now - self._events[0] > self.window_seconds:
+            self._events.popleft()
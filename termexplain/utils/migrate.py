@@ -0,0 +1,45 @@
+"""
+Cache Migration for termExplain
+
+Converts a JSON cache (``error_logs.json``) into the compressed binary store.
+
+Usage:
+    python -m termexplain.utils.migrate [CACHE_DIR]  (default: ~/.cache/termexplain)
+"""
+
+import os
+import sys
+import click
+
+from termexplain.utils.cache import ErrorCache, default_cache_dir
+from termexplain.utils.store import migrate_json_to_store
+
+@click.command()
+@click.argument('cache_dir', required=False)
+@click.option('--no-train', is_flag=True, help='Use the built-in dictionary instead of training one')
+@click.option('--remove-json', is_flag=True, help='Delete error_logs.json after a successful migration')
+def main(cache_dir, no_train, remove_json):
+    """Migrate a termExplain JSON cache to the compressed binary store."""
+    cache_dir = cache_dir or default_cache_dir()
+    json_path = os.path.join(cache_dir, "error_logs.json")
+    store_path = os.path.join(cache_dir, "error_logs.bin")
+
+    if not os.path.exists(json_path):
+        click.echo(f"No JSON cache found at {json_path}")
+        sys.exit(1)
+
+    stats = migrate_json_to_store(json_path, store_path, train=not no_train)
+    click.echo(f"Migrated {stats['entries']} entries to {store_path}")
+    click.echo(f"Size: {stats['json_size_bytes']} -> {stats['store_size_bytes']} bytes "
+               f"({stats['compression_ratio']}x smaller)")
+
+    # Report decode cost on the migrated store
+    store_stats = ErrorCache(cache_dir, storage="binary").get_stats()
+    click.echo(f"Average decode: {store_stats['avg_decode_us']} µs per entry")
+
+    if remove_json:
+        os.remove(json_path)
+        click.echo(f"Removed {json_path}")
+
+if __name__ == '__main__':
+    main()
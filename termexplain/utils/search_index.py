@@ -0,0 +1,206 @@
+"""
+Search Index for termExplain
+
+Inverted token index over cached entries, kept in a SQLite file next to the
+cache so searching never has to decode every entry. The index remembers the
+cache's change marker, so a sync after nothing changed costs one lookup and
+a sync after a few saves reads only those records (compressed storage).
+"""
+
+import os
+import re
+import sqlite3
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Set, Tuple
+import logging
+
+# Entries decoded per turn of the cache lock during a sync
+SYNC_BATCH_SIZE = 500
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+# Query terms shorter than this also match longer words they start with, and
+# near-match candidates ignore them
+MIN_TOKEN_LENGTH = 3
+
+# Bumped when tokenization changes, so existing indexes are rebuilt
+INDEX_VERSION = "2"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (key TEXT PRIMARY KEY, timestamp TEXT);
+CREATE TABLE IF NOT EXISTS postings (token TEXT NOT NULL, key TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS postings_token ON postings (token);
+CREATE INDEX IF NOT EXISTS postings_key ON postings (key);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Split text into lowercase search tokens.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Set of unique tokens
+    """
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+class SearchIndex:
+    """Token index mapping search terms to cache keys."""
+
+    def __init__(self, cache_dir: str):
+        """
+        Open or create the index.
+
+        Args:
+            cache_dir: Cache directory the index lives in
+        """
+        self.path = os.path.join(cache_dir, "search_index.sqlite3")
+        self.logger = logging.getLogger(__name__)
+        # Concurrent syncs (CI jobs sharing a cache) wait for each other's writes
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != INDEX_VERSION:
+            with self.conn:
+                self.conn.execute("DELETE FROM postings")
+                self.conn.execute("DELETE FROM docs")
+                self.conn.execute("DELETE FROM meta")
+                self.conn.execute("INSERT INTO meta (name, value) VALUES ('version', ?)", (INDEX_VERSION,))
+
+    def sync(self, cache, lock=None) -> Tuple[int, int]:
+        """
+        Bring the index up to date with a cache.
+
+        Only entries that were added or re-saved since the last sync are
+        decoded and tokenized. When the cache can say what changed since the
+        last sync, nothing else is read; otherwise every timestamp is compared.
+
+        Args:
+            cache: ErrorCache to index
+            lock: Lock guarding the cache (e.g. TieredCache's); it is held only
+                while the cache is read, in short turns, never during index writes
+
+        Returns:
+            Tuple of (entries indexed, entries removed)
+        """
+        lock = lock if lock is not None else nullcontext()
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'marker'").fetchone()
+        with lock:
+            marker = cache.change_marker()
+            if row is not None and row[0] == marker:
+                return 0, 0
+            changes = cache.changes_since(row[0]) if row is not None else None
+            current = changes['timestamps'] if changes is not None else cache.get_timestamps()
+
+        if changes is not None:
+            keys = list(current) + changes['removed']
+            indexed = self._timestamps(keys)
+            removed = [key for key in changes['removed'] if key in indexed]
+        else:
+            indexed = dict(self.conn.execute("SELECT key, timestamp FROM docs"))
+            removed = [key for key in indexed if key not in current]
+        stale = [key for key, timestamp in current.items() if indexed.get(key) != timestamp]
+
+        postings: List[Tuple[str, str]] = []
+        docs: List[Tuple[str, str]] = []
+        for start in range(0, len(stale), SYNC_BATCH_SIZE):
+            with lock:
+                entries = [(key, cache.cache_data.get(key)) for key in stale[start:start + SYNC_BATCH_SIZE]]
+            for key, entry in entries:
+                if entry is None:
+                    continue
+                text = f"{entry.get('error_text', '')}\n{entry.get('explanation', '')}"
+                postings.extend((token, key) for token in tokenize(text))
+                docs.append((key, current[key]))
+
+        with self.conn:
+            # Another process may have indexed the same entries since we compared
+            # timestamps, so every key written is cleared first, in the same transaction
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._remove(removed + [key for key, _ in docs])
+            self.conn.executemany("INSERT INTO postings (token, key) VALUES (?, ?)", postings)
+            self.conn.executemany("INSERT INTO docs (key, timestamp) VALUES (?, ?)", docs)
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('marker', ?)", (marker,))
+
+        if stale or removed:
+            self.logger.info(f"Indexed {len(stale)} entries, removed {len(removed)}")
+        return len(stale), len(removed)
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """
+        Find cache keys whose entries contain every token in the query.
+
+        Terms shorter than three characters also match words that start
+        with them ("ls" matches both "ls" and "lsof").
+
+        Args:
+            query: Search terms
+            limit: Maximum number of keys to return
+
+        Returns:
+            Matching cache keys
+        """
+        tokens = sorted(tokenize(query))
+        if not tokens:
+            return []
+
+        clauses = []
+        params: List[str] = []
+        for token in tokens:
+            if len(token) >= MIN_TOKEN_LENGTH:
+                clauses.append("SELECT key FROM postings WHERE token = ?")
+                params.append(token)
+            else:
+                # Range scan on the token index; '{' sorts right after 'z'
+                clauses.append("SELECT key FROM postings WHERE token >= ? AND token < ?")
+                params.extend((token, token + "{"))
+        rows = self.conn.execute(f"{' INTERSECT '.join(clauses)} LIMIT ?", (*params, limit))
+        return [key for (key,) in rows]
+
+    def candidates(self, text: str, limit: int = 20) -> List[str]:
+        """
+        Find cache keys sharing the most tokens with a text.
+
+        Args:
+            text: Text to match (usually an error)
+            limit: Maximum number of keys to return
+
+        Returns:
+            Keys ordered by the number of shared tokens
+        """
+        tokens = sorted(token for token in tokenize(text) if len(token) >= MIN_TOKEN_LENGTH)[:200]
+        if not tokens:
+            return []
+
+        placeholders = ",".join("?" * len(tokens))
+        rows = self.conn.execute(
+            f"SELECT key FROM postings WHERE token IN ({placeholders}) "
+            f"GROUP BY key ORDER BY COUNT(*) DESC LIMIT ?",
+            (*tokens, limit),
+        )
+        return [key for (key,) in rows]
+
+    def vacuum(self):
+        """Reclaim space left by removed entries."""
+        self.conn.execute("VACUUM")
+
+    def close(self):
+        """Close the index."""
+        self.conn.close()
+
+    def _timestamps(self, keys: List[str]) -> Dict[str, str]:
+        """Indexed timestamps for some keys."""
+        indexed: Dict[str, str] = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            indexed.update(self.conn.execute(
+                f"SELECT key, timestamp FROM docs WHERE key IN ({placeholders})", chunk))
+        return indexed
+
+    def _remove(self, keys: Iterable[str]):
+        keys = [(key,) for key in keys]
+        self.conn.executemany("DELETE FROM postings WHERE key = ?", keys)
+        self.conn.executemany("DELETE FROM docs WHERE key = ?", keys)
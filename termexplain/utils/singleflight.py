@@ -0,0 +1,316 @@
+"""
+Single-Flight for termExplain
+
+Coalesces concurrent requests for the same key so only one caller does the
+work. Threads in one process share an in-memory flight; separate processes
+(e.g. CI shards on one machine) coordinate through lease files, and a lease
+whose holder died is taken over once it expires. The holder renews its lease
+while the call runs, so a slow call isn't mistaken for a dead one. A result
+is only handed to processes that waited on the lease it was produced under,
+and is deleted once they have read it.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+class _Flight:
+    """An in-process call that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Runs at most one call per key at a time, across threads and processes."""
+
+    def __init__(self, lock_dir: str, lease_seconds: float = 60.0, poll_interval: float = 0.05):
+        """
+        Initialize single-flight coordination.
+
+        Args:
+            lock_dir: Directory for lease and result files
+            lease_seconds: How long a lease is honoured before it is presumed dead
+            poll_interval: Seconds between checks while waiting on another process
+        """
+        self.lock_dir = lock_dir
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._hostname = socket.gethostname()
+
+        # Counters for reporting
+        self.calls = 0
+        self.shared = 0
+        self.wait_seconds = 0.0
+
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key (the cache hash)
+            fn: Function producing the result
+
+        Returns:
+            Tuple of (result, shared) where shared is True if another caller did the work
+
+        Raises:
+            Exception: Whatever fn raised, for the caller that ran it and its
+                in-process waiters
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            start = time.monotonic()
+            flight.done.wait()
+            self._count_shared(time.monotonic() - start)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result, shared = self._do_across_processes(key, fn)
+            return flight.result, shared
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _do_across_processes(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """Coordinate with other processes through lease files."""
+        lease_path = os.path.join(self.lock_dir, f"{key}.lease")
+        result_path = os.path.join(self.lock_dir, f"{key}.result")
+        lease_id = uuid.uuid4().hex
+        start = time.monotonic()
+        # Leases we waited on -> our waiter file; only their results are ours to take
+        waiting: Dict[str, str] = {}
+
+        try:
+            while True:
+                result = self._read_result(result_path, waiting)
+                if result is not None:
+                    self._count_shared(time.monotonic() - start)
+                    return result, True
+
+                if self._acquire(lease_path, lease_id):
+                    # The leader we waited on may have published and released between our read and acquire
+                    result = self._read_result(result_path, waiting)
+                    if result is not None:
+                        self._release(lease_path)
+                        self._count_shared(time.monotonic() - start)
+                        return result, True
+                    break
+
+                lease = self._read_lease(lease_path)
+                if lease is None:
+                    continue
+                if self._is_stale(lease_path, lease):
+                    self._break_lease(lease_path)
+                    continue
+
+                holder = lease.get('id')
+                if holder and holder not in waiting:
+                    waiting[holder] = self._register_waiter(key, holder)
+                self._touch_waiters(waiting)
+                time.sleep(self.poll_interval)
+        finally:
+            for holder, waiter_path in waiting.items():
+                self._remove(waiter_path)
+                self._discard_result(key, holder, result_path)
+
+        with self._lock:
+            self.calls += 1
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lease_path, lease_id, stop_heartbeat),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            result = fn()
+            self._write_result(result_path, lease_id, result)
+            self._sweep()
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            self._release(lease_path)
+        # Nobody waiting means nobody will pick the result up
+        self._discard_result(key, lease_id, result_path)
+        return result, False
+
+    def _release(self, lease_path: str):
+        self._remove(lease_path)
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _heartbeat(self, lease_path: str, lease_id: str, stop: threading.Event):
+        """Push the lease's expiry forward until stop is set."""
+        while not stop.wait(self.lease_seconds / 3):
+            tmp_path = f"{lease_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(self._lease(lease_id), f)
+                if not os.path.exists(lease_path):
+                    # Broken by a waiter that thought we were dead; don't resurrect it
+                    os.remove(tmp_path)
+                    return
+                os.replace(tmp_path, lease_path)
+            except OSError as e:
+                self.logger.warning(f"Could not renew lease {os.path.basename(lease_path)}: {e}")
+
+    def _acquire(self, lease_path: str, lease_id: str) -> bool:
+        """Try to create the lease file; True if we now hold it."""
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._lease(lease_id), f)
+        return True
+
+    def _lease(self, lease_id: str) -> Dict[str, object]:
+        return {
+            'id': lease_id,
+            'host': self._hostname,
+            'pid': os.getpid(),
+            'expires': time.time() + self.lease_seconds,
+        }
+
+    def _read_lease(self, lease_path: str) -> Optional[Dict[str, object]]:
+        """Read a lease; None if it is gone, {} if it is half-written."""
+        try:
+            with open(lease_path, "r") as f:
+                lease = json.load(f)
+            return lease if isinstance(lease, dict) else {}
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError):
+            return {}
+
+    def _is_stale(self, lease_path: str, lease: Dict[str, object]) -> bool:
+        """Whether the lease expired or its holder is a dead local process."""
+        if not lease:
+            # Half-written lease; judge it by age instead
+            try:
+                return time.time() - os.path.getmtime(lease_path) > self.lease_seconds
+            except OSError:
+                return False
+
+        if time.time() > lease.get('expires', 0):
+            return True
+        if lease.get('host') == self._hostname:
+            try:
+                os.kill(lease['pid'], 0)
+            except ProcessLookupError:
+                return True
+            except (PermissionError, KeyError, TypeError):
+                pass
+        return False
+
+    def _break_lease(self, lease_path: str):
+        """Remove a stale lease so a waiter can take over."""
+        # Renaming first means only one waiter breaks a given lease; in the
+        # rare case two do, the worst outcome is one duplicate request
+        stale_path = f"{lease_path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(lease_path, stale_path)
+            os.remove(stale_path)
+            self.logger.warning(f"Took over expired lease {os.path.basename(lease_path)}")
+        except OSError:
+            pass
+
+    def _register_waiter(self, key: str, lease_id: str) -> str:
+        """Record that this caller waits on a lease, so its result is kept until we read it."""
+        waiter_path = os.path.join(self.lock_dir, f"{key}.{lease_id}.{uuid.uuid4().hex}.waiting")
+        try:
+            with open(waiter_path, "w"):
+                pass
+        except OSError:
+            pass
+        return waiter_path
+
+    def _touch_waiters(self, waiting: Dict[str, str]):
+        """Keep long waits' waiter files from being swept."""
+        now = time.time()
+        for waiter_path in waiting.values():
+            try:
+                if now - os.path.getmtime(waiter_path) > self.lease_seconds / 3:
+                    os.utime(waiter_path)
+            except OSError:
+                pass
+
+    def _waiters(self, key: str, lease_id: str) -> bool:
+        """Whether anyone is still waiting for the result of a lease."""
+        prefix = f"{key}.{lease_id}."
+        try:
+            return any(name.startswith(prefix) and name.endswith(".waiting") for name in os.listdir(self.lock_dir))
+        except OSError:
+            return False
+
+    def _discard_result(self, key: str, lease_id: str, result_path: str):
+        """Remove a lease's result once no waiter needs it."""
+        if self._waiters(key, lease_id):
+            return
+        try:
+            with open(result_path, "r", encoding="utf-8") as f:
+                if json.load(f).get('lease') != lease_id:
+                    return
+            os.remove(result_path)
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _read_result(self, result_path: str, waiting: Dict[str, str]) -> Optional[str]:
+        """Read a result published for one of the leases we waited on."""
+        if not waiting:
+            return None
+        try:
+            with open(result_path, "r", encoding="utf-8") as f:
+                published = json.load(f)
+            if published.get('lease') in waiting:
+                return published['result']
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+        return None
+
+    def _write_result(self, result_path: str, lease_id: str, result: str):
+        """Publish a result atomically for the processes waiting on our lease."""
+        tmp_path = f"{result_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'lease': lease_id, 'result': result}, f)
+        os.replace(tmp_path, result_path)
+
+    def _sweep(self):
+        """Remove results and waiter files left behind by crashed processes."""
+        cutoff = time.time() - self.lease_seconds
+        try:
+            for entry in os.scandir(self.lock_dir):
+                if entry.name.endswith((".result", ".waiting")) and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError:
+            pass
+
+    def _count_shared(self, waited: float):
+        with self._lock:
+            self.shared += 1
+            self.wait_seconds += waited
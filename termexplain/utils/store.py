@@ -0,0 +1,510 @@
+"""
+Compressed Store for termExplain
+
+Compact binary storage for cache entries. Each entry is serialized as compact
+JSON and deflated against a shared dictionary trained from the entries
+themselves, so the boilerplate that every explanation repeats (section
+headers, traceback preambles, common stack frames) costs almost nothing.
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+from collections import Counter
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from termexplain.utils.filelock import file_lock
+
+# File layout:
+#   header  : MAGIC | u32 dictionary length | dictionary bytes
+#   records : u8 flags | u16 key length | u32 payload length | f64 timestamp | key | payload
+MAGIC = b"TXC1"
+HEADER_STRUCT = struct.Struct("<4sI")
+RECORD_STRUCT = struct.Struct("<BHId")
+
+FLAG_ENTRY = 0
+FLAG_TOMBSTONE = 1
+
+# zlib only looks back 32KB, so a larger dictionary would be wasted
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+# Error texts above this size are stored as a preview; the key is their digest
+LARGE_TEXT_THRESHOLD = 16 * 1024
+PREVIEW_SIZE = 1024
+
+# Strings that show up in nearly every entry, used when no samples are available
+SEED_STRINGS = [
+    "Traceback (most recent call last):\n",
+    '  File "',
+    '", line ',
+    ", in <module>\n",
+    "    at ",
+    "node:internal/",
+    "ModuleNotFoundError: No module named '",
+    "command not found",
+    "Permission denied",
+    "No such file or directory",
+    "**What this error means**",
+    "**Why it likely occurred**",
+    "**How to fix it**",
+    "1. **What this error means**\n",
+    "2. **Why it likely occurred**\n",
+    "3. **How to fix it**\n",
+    "* **",
+    "```bash\n",
+    "pip install ",
+    "npm install ",
+]
+
+# Field names of the serialized entry itself
+SEED_FIELDS = b'{"error_text":"","explanation":"","timestamp":"'
+
+
+
+class EntryCodec:
+    """Encodes cache entries to compressed bytes using a shared dictionary."""
+
+    def __init__(self, dictionary: Optional[bytes] = None, level: int = 9):
+        """
+        Initialize the codec.
+
+        Args:
+            dictionary: Shared zlib dictionary (default: built from seed strings)
+            level: zlib compression level
+        """
+        self.dictionary = dictionary if dictionary is not None else self.default_dictionary()
+        self.level = level
+
+    @staticmethod
+    def default_dictionary() -> bytes:
+        """Build a dictionary from the built-in seed strings."""
+        # Escape the seeds the same way they appear inside serialized entries
+        text = "".join(json.dumps(s, ensure_ascii=False)[1:-1] for s in SEED_STRINGS)
+        return text.encode("utf-8") + SEED_FIELDS
+
+    @classmethod
+    def train(cls, samples: Iterable[Dict[str, Any]], max_size: int = MAX_DICTIONARY_SIZE) -> bytes:
+        """
+        Train a shared dictionary from sample entries.
+
+        Lines that recur across entries are collected, and the most frequent
+        ones are placed at the end of the dictionary where zlib finds them
+        with the shortest back-references.
+
+        Args:
+            samples: Cache entries to learn from
+            max_size: Maximum dictionary size in bytes
+
+        Returns:
+            Dictionary bytes
+        """
+        counts: Counter = Counter()
+        for entry in samples:
+            payload = cls._serialize(cls._compact(entry))
+            # Count each line once per entry so one huge log can't dominate
+            counts.update(set(payload.split(b"\\n")))
+
+        recurring = [(line, n) for line, n in counts.items() if n > 1 and len(line) > 3]
+        # Weight by bytes saved, then keep the best lines that fit
+        recurring.sort(key=lambda item: item[1] * len(item[0]), reverse=True)
+
+        chosen: List[Tuple[bytes, int]] = []
+        size = 0
+        for line, n in recurring:
+            if size + len(line) + 2 > max_size:
+                continue
+            chosen.append((line, n))
+            size += len(line) + 2
+
+        seed = cls.default_dictionary()
+        chosen.sort(key=lambda item: item[1])
+        trained = b"\\n".join(line for line, _ in chosen)
+        return (seed[: max(0, max_size - len(trained))] + trained)[-max_size:]
+
+    def encode(self, entry: Dict[str, Any]) -> bytes:
+        """
+        Encode a cache entry.
+
+        Args:
+            entry: Cache entry dictionary
+
+        Returns:
+            Compressed payload
+        """
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, self.dictionary)
+        return compressor.compress(self._serialize(self._compact(entry))) + compressor.flush()
+
+    def decode(self, payload: bytes, key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Decode a compressed payload back into a cache entry.
+
+        Args:
+            payload: Compressed payload
+            key: Cache key, restored as the entry's ``hash`` field
+
+        Returns:
+            Cache entry dictionary
+        """
+        decompressor = zlib.decompressobj(-15, self.dictionary)
+        entry = json.loads(decompressor.decompress(payload) + decompressor.flush())
+        if key is not None:
+            entry["hash"] = key
+        return entry
+
+    @staticmethod
+    def _compact(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop fields the record header already carries and shrink large texts."""
+        compact = {k: v for k, v in entry.items() if k != "hash"}
+        error_text = compact.get("error_text")
+        if isinstance(error_text, str) and len(error_text) > LARGE_TEXT_THRESHOLD:
+            compact["error_text"] = error_text[:PREVIEW_SIZE]
+            compact["error_text_truncated"] = len(error_text)
+        return compact
+
+    @staticmethod
+    def _serialize(entry: Dict[str, Any]) -> bytes:
+        return json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _entry_timestamp(entry: Dict[str, Any]) -> float:
+    """Return an entry's timestamp as epoch seconds (0 if missing or invalid)."""
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+class CompressedStore(MutableMapping):
+    """
+    Append-only, dictionary-compressed entry store.
+
+    Behaves like the ``dict`` that ErrorCache keeps in memory, but only the
+    record offsets live in RAM; entries are decoded on access. Writes append
+    a record (deletes append a tombstone), so saving one entry never rewrites
+    the file.
+
+    Several processes can share a store. Writers hold a file lock and first
+    pick up records that other processes appended; readers notice appends
+    and rewrites (a rewrite replaces the file) and refresh their index.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open or create a store.
+
+        Args:
+            path: Path to the binary store file
+        """
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        # key -> (payload offset, payload length, timestamp)
+        self._index: Dict[str, Tuple[int, int, float]] = {}
+        self.dead_records = 0
+        self.decode_count = 0
+        self.decode_seconds = 0.0
+        # Identity of the file the index describes, and where its last complete record ends
+        self._inode = None
+        self._end = 0
+
+        with file_lock(path):
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                self._write_header(path, EntryCodec.default_dictionary())
+        self._load()
+
+    @staticmethod
+    def _write_header(path: str, dictionary: bytes):
+        with open(path, "wb") as f:
+            f.write(HEADER_STRUCT.pack(MAGIC, len(dictionary)))
+            f.write(dictionary)
+
+    def _replace_with_header(self, dictionary: bytes) -> str:
+        """Write a header-only file next to the store and return its path."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._write_header(tmp_path, dictionary)
+        return tmp_path
+
+    def _load(self):
+        """Read the dictionary and build the offset index from record headers."""
+        self._index = {}
+        self.dead_records = 0
+        with open(self.path, "rb") as f:
+            magic, dict_len = HEADER_STRUCT.unpack(f.read(HEADER_STRUCT.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a termExplain cache store: {self.path}")
+            self.codec = EntryCodec(f.read(dict_len))
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._read_records(f, f.tell())
+
+    def _read_records(self, f, offset: int):
+        """Apply the complete records from offset to the end of the file."""
+        f.seek(offset)
+        file_size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.read(RECORD_STRUCT.size)
+            if len(header) < RECORD_STRUCT.size:
+                break
+            flags, key_len, payload_len, timestamp = RECORD_STRUCT.unpack(header)
+            payload_offset = offset + RECORD_STRUCT.size + key_len
+            if payload_offset + payload_len > file_size:
+                # Truncated tail from an interrupted write (or one still in progress)
+                break
+            key = f.read(key_len).decode("utf-8")
+            f.seek(payload_len, os.SEEK_CUR)
+
+            self._apply(flags, key, payload_offset, payload_len, timestamp)
+            offset = payload_offset + payload_len
+        self._end = offset
+
+    def refresh(self):
+        """Pick up records other processes appended, or reload after a rewrite."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._end:
+            self._load()
+        elif stat.st_size > self._end:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_ino != self._inode:
+                    self._load()
+                else:
+                    self._read_records(f, self._end)
+
+    def _apply(self, flags: int, key: str, payload_offset: int, payload_len: int, timestamp: float):
+        """Apply one record to the offset index."""
+        if key in self._index:
+            # The previous record for this key is now dead
+            self.dead_records += 1
+        if flags == FLAG_TOMBSTONE:
+            self._index.pop(key, None)
+            self.dead_records += 1
+        else:
+            self._index[key] = (payload_offset, payload_len, timestamp)
+
+    def _append(self, records: Iterable[Tuple[int, str, bytes, float]]):
+        """Append records in one write and update the index."""
+        records = list(records)
+        if not records:
+            return
+
+        with file_lock(self.path):
+            # Other writers are locked out, so everything past our last
+            # complete record is theirs (or an interrupted write's)
+            self.refresh()
+            with open(self.path, "r+b") as f:
+                if os.fstat(f.fileno()).st_size > self._end:
+                    self.logger.warning(f"Dropping truncated record at offset {self._end}")
+                    f.truncate(self._end)
+                f.seek(self._end)
+                offset = self._end
+                chunks = []
+                updates = []
+                for flags, key, payload, timestamp in records:
+                    key_bytes = key.encode("utf-8")
+                    chunks.append(RECORD_STRUCT.pack(flags, len(key_bytes), len(payload), timestamp))
+                    chunks.append(key_bytes)
+                    chunks.append(payload)
+                    payload_offset = offset + RECORD_STRUCT.size + len(key_bytes)
+                    updates.append((flags, key, payload_offset, len(payload), timestamp))
+                    offset = payload_offset + len(payload)
+                f.write(b"".join(chunks))
+
+            for update in updates:
+                self._apply(*update)
+            self._end = offset
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        if key not in self._index:
+            self.refresh()
+        offset, length, _ = self._index[key]
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_ino != self._inode:
+                # Rewritten by another process; our offsets describe the old file
+                self._load()
+                offset, length, _ = self._index[key]
+            f.seek(offset)
+            payload = f.read(length)
+        start = time.perf_counter()
+        try:
+            entry = self.codec.decode(payload, key)
+        except (zlib.error, ValueError) as e:
+            # A damaged record reads as a miss rather than an error
+            self.logger.warning(f"Could not decode cache entry {key[:12]}: {e}")
+            raise KeyError(key) from e
+        self.decode_seconds += time.perf_counter() - start
+        self.decode_count += 1
+        return entry
+
+    def __setitem__(self, key: str, entry: Dict[str, Any]):
+        self._append([(FLAG_ENTRY, key, self.codec.encode(entry), _entry_timestamp(entry))])
+
+    def __delitem__(self, key: str):
+        if key not in self._index:
+            raise KeyError(key)
+        self._append([(FLAG_TOMBSTONE, key, b"", 0.0)])
+
+    def __contains__(self, key: object) -> bool:
+        if key not in self._index:
+            self.refresh()
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def update(self, other=(), **kwargs):
+        """Add many entries with a single append."""
+        items = other.items() if hasattr(other, "items") else other
+        records = [
+            (FLAG_ENTRY, key, self.codec.encode(entry), _entry_timestamp(entry))
+            for key, entry in list(items) + list(kwargs.items())
+        ]
+        self._append(records)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove many entries with a single append. Returns the number removed."""
+        records = [(FLAG_TOMBSTONE, key, b"", 0.0) for key in keys if key in self._index]
+        self._append(records)
+        return len(records)
+
+    def clear(self):
+        """Remove every entry, keeping the current dictionary."""
+        with file_lock(self.path):
+            # Replace rather than truncate, so other processes see a new file
+            os.replace(self._replace_with_header(self.codec.dictionary), self.path)
+            self._load()
+
+    def marker(self) -> str:
+        """Return a string that changes whenever the store's contents do."""
+        self.refresh()
+        return f"{self._inode}:{self._end}"
+
+    def changes_since(self, marker: str) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        List the keys written and removed since marker() returned marker.
+
+        Only the record headers appended since then are read.
+
+        Args:
+            marker: An earlier marker() value
+
+        Returns:
+            Tuple of (keys with a current entry, keys removed), or None if the
+            store was rewritten since and the caller has to compare everything
+        """
+        try:
+            inode, offset = (int(part) for part in marker.split(":"))
+        except ValueError:
+            return None
+        self.refresh()
+        if inode != self._inode or offset > self._end:
+            return None
+
+        touched = set()
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while offset < self._end:
+                _, key_len, payload_len, _ = RECORD_STRUCT.unpack(f.read(RECORD_STRUCT.size))
+                touched.add(f.read(key_len).decode("utf-8"))
+                f.seek(payload_len, os.SEEK_CUR)
+                offset += RECORD_STRUCT.size + key_len + payload_len
+        written = [key for key in touched if key in self._index]
+        removed = [key for key in touched if key not in self._index]
+        return written, removed
+
+    def timestamp(self, key: str) -> float:
+        """Return an entry's timestamp (epoch seconds) without decoding it."""
+        return self._index[key][2]
+
+    def rewrite(self, dictionary: Optional[bytes] = None):
+        """
+        Rewrite the store without dead records, optionally with a new dictionary.
+
+        Args:
+            dictionary: New shared dictionary; entries are re-encoded with it
+        """
+        with file_lock(self.path):
+            # Keep records other processes appended since we loaded
+            self.refresh()
+            new_codec = EntryCodec(dictionary) if dictionary is not None else self.codec
+            tmp_path = self._replace_with_header(new_codec.dictionary)
+            with open(self.path, "rb") as src, open(tmp_path, "ab") as dst:
+                for key, (offset, length, timestamp) in self._index.items():
+                    src.seek(offset)
+                    payload = src.read(length)
+                    if new_codec is not self.codec:
+                        try:
+                            payload = new_codec.encode(self.codec.decode(payload))
+                        except (zlib.error, ValueError):
+                            self.logger.warning(f"Dropping undecodable cache entry {key[:12]}")
+                            continue
+                    key_bytes = key.encode("utf-8")
+                    dst.write(RECORD_STRUCT.pack(FLAG_ENTRY, len(key_bytes), len(payload), timestamp))
+                    dst.write(key_bytes)
+                    dst.write(payload)
+            os.replace(tmp_path, self.path)
+            self._load()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get compression statistics.
+
+        Returns:
+            Dictionary with compression ratio and decode cost
+        """
+        payload_bytes = 0
+        raw_bytes = 0
+        sample_keys = list(self._index)[:200]
+        for key in sample_keys:
+            entry = self.get(key)
+            if entry is None or key not in self._index:
+                continue
+            raw_bytes += len(json.dumps(entry, indent=2, ensure_ascii=False).encode("utf-8"))
+            payload_bytes += self._index[key][1]
+
+        return {
+            'dictionary_bytes': len(self.codec.dictionary),
+            'dead_records': self.dead_records,
+            'compression_ratio': round(raw_bytes / payload_bytes, 2) if payload_bytes else 0.0,
+            'avg_decode_us': round(self.decode_seconds / self.decode_count * 1e6, 1) if self.decode_count else 0.0,
+        }
+
+
+def migrate_json_to_store(json_path: str, store_path: str, train: bool = True) -> Dict[str, Any]:
+    """
+    Convert a JSON cache file into a compressed store.
+
+    Args:
+        json_path: Existing ``error_logs.json`` file
+        store_path: Destination store file (overwritten)
+        train: Train a shared dictionary from the entries being migrated
+
+    Returns:
+        Dictionary with migration statistics
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    dictionary = EntryCodec.train(data.values()) if train and data else EntryCodec.default_dictionary()
+    if os.path.exists(store_path):
+        os.remove(store_path)
+    CompressedStore._write_header(store_path, dictionary)
+
+    store = CompressedStore(store_path)
+    store.update(data)
+
+    json_size = os.path.getsize(json_path)
+    store_size = os.path.getsize(store_path)
+    return {
+        'entries': len(store),
+        'json_size_bytes': json_size,
+        'store_size_bytes': store_size,
+        'compression_ratio': round(json_size / store_size, 2) if store_size else 0.0,
+    }
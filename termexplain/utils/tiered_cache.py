@@ -0,0 +1,282 @@
+"""
+Tiered Cache for termExplain
+
+Layers an in-process LRU (L1) over the on-disk ErrorCache (L2) and an
+optional shared network cache (L3), so an explanation fetched on one machine
+becomes a hit everywhere. Reads go through the tiers in order and promote
+what they find; writes land in L1 at once and reach L2/L3 in the background.
+"""
+
+import atexit
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import logging
+
+class LRUCache:
+    """Small thread-safe least-recently-used map."""
+
+    def __init__(self, max_items: int = 256):
+        """
+        Initialize the LRU.
+
+        Args:
+            max_items: Maximum number of entries
+        """
+        self.max_items = max_items
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+class RemoteCache:
+    """Client for a shared cache speaking the memcached text protocol."""
+
+    def __init__(self, address: str, timeout: float = 0.5, ttl_days: int = 30,
+                 prefix: str = "termexplain:", retry_after: float = 30.0):
+        """
+        Initialize the client.
+
+        Args:
+            address: Server address as host:port
+            timeout: Socket timeout in seconds
+            ttl_days: Expiry for stored entries
+            prefix: Prefix added to every key
+            retry_after: Seconds to skip the server after a failure
+        """
+        host, _, port = address.rpartition(":")
+        self.address: Tuple[str, int] = (host or "127.0.0.1", int(port))
+        self.timeout = timeout
+        self.ttl = ttl_days * 86400
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.logger = logging.getLogger(__name__)
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Fetch a value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Stored value, or None on a miss or when the server is unreachable
+        """
+        def request():
+            self._sock.sendall(f"get {self.prefix}{key}\r\n".encode())
+            value = None
+            while True:
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("Connection closed")
+                if line.startswith(b"VALUE"):
+                    length = int(line.split()[3])
+                    value = self._file.read(length + 2)[:length].decode("utf-8")
+                elif line.startswith(b"END"):
+                    return value
+                else:
+                    raise ConnectionError(f"Unexpected reply: {line!r}")
+
+        return self._call(request)
+
+    def set(self, key: str, value: str) -> bool:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: Value to store
+
+        Returns:
+            True if the server stored it
+        """
+        def request():
+            data = value.encode("utf-8")
+            header = f"set {self.prefix}{key} 0 {self.ttl} {len(data)}\r\n".encode()
+            self._sock.sendall(header + data + b"\r\n")
+            return self._file.readline().startswith(b"STORED")
+
+        return bool(self._call(request))
+
+    def _call(self, request):
+        """Run a request, reconnecting once and backing off if the server is down."""
+        with self._lock:
+            if time.monotonic() < self._down_until:
+                return None
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                        self._file = self._sock.makefile("rb")
+                    return request()
+                except (OSError, ValueError, IndexError) as e:
+                    self._close()
+                    if attempt:
+                        self.logger.warning(f"Shared cache unavailable ({e}); retrying in {self.retry_after:.0f}s")
+                        self._down_until = time.monotonic() + self.retry_after
+            return None
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._file = None
+
+    def close(self):
+        """Close the connection."""
+        with self._lock:
+            self._close()
+
+class TieredCache:
+    """Read-through, write-behind cache over memory, disk and a shared tier."""
+
+    def __init__(self, local, remote: Optional[RemoteCache] = None, l1_size: int = 256,
+                 write_behind: bool = True):
+        """
+        Initialize the tiered cache.
+
+        Args:
+            local: ErrorCache used as the on-disk tier
+            remote: Shared tier client (optional)
+            l1_size: Number of explanations kept in memory
+            write_behind: Write to disk and the shared tier on a background thread
+        """
+        self.local = local
+        self.remote = remote
+        self.l1 = LRUCache(l1_size)
+        self.logger = logging.getLogger(__name__)
+        # ErrorCache is not thread-safe; every access to it goes through this lock
+        self._local_lock = threading.Lock()
+        self.hits = {'l1': 0, 'l2': 0, 'l3': 0}
+        self.misses = 0
+
+        self._queue: Optional[queue.Queue] = None
+        if write_behind:
+            self._queue = queue.Queue()
+            threading.Thread(target=self._writer, name="termexplain-write-behind", daemon=True).start()
+            atexit.register(self.flush)
+
+    @property
+    def cache_dir(self) -> str:
+        """Directory of the on-disk tier."""
+        return self.local.cache_dir
+
+    def cache_key(self, error_text: str) -> str:
+        """Get the key an error is cached under."""
+        return self.local.cache_key(error_text)
+
+    def get(self, error_text: str) -> Optional[str]:
+        """
+        Look an error up in each tier, promoting hits to the faster tiers.
+
+        Args:
+            error_text: The error text to look up
+
+        Returns:
+            Cached explanation, or None
+        """
+        key = self.cache_key(error_text)
+
+        explanation = self.l1.get(key)
+        if explanation is not None:
+            self.hits['l1'] += 1
+            return explanation
+
+        with self._local_lock:
+            explanation = self.local.get(error_text)
+        if explanation is not None:
+            self.hits['l2'] += 1
+            self.l1.put(key, explanation)
+            return explanation
+
+        if self.remote is not None:
+            fingerprint_key = self.local.fingerprint_key(error_text)
+            for remote_key in (key, fingerprint_key) if fingerprint_key != key else (key,):
+                explanation = self.remote.get(remote_key)
+                if explanation is not None:
+                    self.hits['l3'] += 1
+                    self.l1.put(key, explanation)
+                    self._write(error_text, explanation, remote=False, by_fingerprint=remote_key != key)
+                    return explanation
+
+        self.misses += 1
+        return None
+
+    def save(self, error_text: str, explanation: str, by_fingerprint: bool = False):
+        """
+        Save an explanation to every tier.
+
+        Args:
+            error_text: The error text
+            explanation: The AI-generated explanation
+            by_fingerprint: Key the entry by the normalized error (see ErrorCache.save)
+        """
+        self.l1.put(self.cache_key(error_text), explanation)
+        self._write(error_text, explanation, remote=True, by_fingerprint=by_fingerprint)
+
+    def find_similar(self, error_text: str, min_similarity: float = 0.6):
+        """Find the most similar entry in the on-disk tier. See ErrorCache.find_similar."""
+        # The lock is taken only around cache reads, so an index sync doesn't
+        # hold up the write-behind thread or L2 lookups
+        return self.local.find_similar(error_text, min_similarity, lock=self._local_lock)
+
+    def flush(self):
+        """Wait until queued writes have reached disk and the shared tier."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def get_stats(self):
+        """
+        Get per-tier hit statistics.
+
+        Returns:
+            Dictionary with hits per tier and misses
+        """
+        return {**{f"{tier}_hits": count for tier, count in self.hits.items()}, 'misses': self.misses}
+
+    def _write(self, error_text: str, explanation: str, remote: bool, by_fingerprint: bool = False):
+        if self._queue is not None:
+            self._queue.put((error_text, explanation, remote, by_fingerprint))
+        else:
+            self._write_now(error_text, explanation, remote, by_fingerprint)
+
+    def _write_now(self, error_text: str, explanation: str, remote: bool, by_fingerprint: bool = False):
+        with self._local_lock:
+            self.local.save(error_text, explanation, by_fingerprint=by_fingerprint)
+        if remote and self.remote is not None:
+            key = self.local.fingerprint_key(error_text) if by_fingerprint else self.cache_key(error_text)
+            self.remote.set(key, explanation)
+
+    def _writer(self):
+        """Background thread applying queued writes."""
+        while True:
+            error_text, explanation, remote, by_fingerprint = self._queue.get()
+            try:
+                self._write_now(error_text, explanation, remote, by_fingerprint)
+            except Exception as e:
+                self.logger.error(f"Write-behind failed: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,190 @@
+"""
+Traceback Parser for termExplain
+
+Extracts stack frames from Python and Node.js error output and pulls a few
+lines of source around the failing frames, so the prompt can carry the code
+that failed instead of the whole log.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+PYTHON_FRAME = re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<line>\d+)(?:, in (?P<function>.+))?$')
+NODE_FRAME = re.compile(r'^\s*at (?:(?P<function>.+?) \()?(?P<file>[^()\s]+?):(?P<line>\d+):(?P<column>\d+)\)?$')
+# Node prints "/path/app.js:12" above the code frame of an uncaught error
+NODE_LOCATION = re.compile(r'^(?P<file>/[^:\s]+\.[cm]?[jt]s):(?P<line>\d+)$')
+
+# Frames from these locations are rarely what the user needs to change
+LIBRARY_MARKERS = ("site-packages", "dist-packages", "node_modules", "node:internal", "/lib/python", "<frozen")
+
+MAX_SOURCE_FILE_BYTES = 2 * 1024 * 1024
+
+def parse_frames(error_text: str) -> List[Dict]:
+    """
+    Extract stack frames from a Python or Node.js traceback.
+
+    Args:
+        error_text: Error output
+
+    Returns:
+        Frames from outermost to innermost, each a dict with file, line,
+        function and language
+    """
+    frames = []
+    for raw in error_text.splitlines():
+        match = PYTHON_FRAME.match(raw)
+        language = "python"
+        if not match:
+            match = NODE_FRAME.match(raw) or NODE_LOCATION.match(raw)
+            language = "node"
+        if not match:
+            continue
+        groups = match.groupdict()
+        frames.append({
+            'file': groups['file'],
+            'line': int(groups['line']),
+            'function': (groups.get('function') or '').strip() or None,
+            'language': language,
+        })
+
+    # Node lists the innermost frame first; Python lists it last
+    if frames and frames[0]['language'] == "node":
+        frames.reverse()
+    return frames
+
+def is_library_frame(frame: Dict) -> bool:
+    """Whether a frame points into installed libraries or the runtime."""
+    return any(marker in frame['file'] for marker in LIBRARY_MARKERS)
+
+class SourceLineCache:
+    """Reads each source file once and serves line ranges from memory."""
+
+    def __init__(self, max_files: int = 64):
+        """
+        Initialize the cache.
+
+        Args:
+            max_files: Maximum number of files kept in memory
+        """
+        self.max_files = max_files
+        # path -> ((mtime, size), lines)
+        self._files: Dict[str, Tuple[Tuple[float, int], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get_lines(self, path: str, line: int, radius: int = 3) -> List[Tuple[int, str]]:
+        """
+        Get the lines around a line number.
+
+        Args:
+            path: Source file
+            line: 1-based line number
+            radius: Lines to include on each side
+
+        Returns:
+            List of (line number, text) pairs; empty if the file can't be read
+        """
+        lines = self._read(path)
+        start = max(1, line - radius)
+        end = min(len(lines), line + radius)
+        return [(n, lines[n - 1]) for n in range(start, end + 1)]
+
+    def _read(self, path: str) -> List[str]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        version = (stat.st_mtime, stat.st_size)
+
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == version:
+                return cached[1]
+
+        if stat.st_size > MAX_SOURCE_FILE_BYTES:
+            lines: List[str] = []
+        else:
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                lines = []
+
+        with self._lock:
+            if len(self._files) >= self.max_files and path not in self._files:
+                self._files.pop(next(iter(self._files)))
+            self._files[path] = (version, lines)
+        return lines
+
+def build_source_context(frames: List[Dict], line_cache: SourceLineCache, base_dir: Optional[str] = None,
+                         budget: int = 2000, radius: int = 3, max_frames: int = 3) -> str:
+    """
+    Format source excerpts for the innermost frames within a size budget.
+
+    Frames in the user's own code are preferred over library frames.
+
+    Args:
+        frames: Frames from parse_frames
+        line_cache: Cache used to read source files
+        base_dir: Directory relative frame paths are resolved against
+        budget: Maximum characters of source context
+        radius: Lines of context on each side of the failing line
+        max_frames: Maximum number of frames to show
+
+    Returns:
+        Formatted excerpts, or an empty string if no source was readable
+    """
+    innermost_first = list(reversed(frames))
+    user_frames = [f for f in innermost_first if not is_library_frame(f)]
+    candidates = user_frames or innermost_first
+
+    blocks = []
+    used = 0
+    seen = set()
+    for frame in candidates:
+        if len(blocks) >= max_frames:
+            break
+        path = frame['file']
+        if base_dir and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        if (path, frame['line']) in seen:
+            continue
+        seen.add((path, frame['line']))
+
+        lines = line_cache.get_lines(path, frame['line'], radius)
+        if not lines:
+            continue
+
+        where = f" in {frame['function']}" if frame['function'] else ""
+        body = "\n".join(
+            f"{'>' if n == frame['line'] else ' '} {n:4d} | {text}" for n, text in lines
+        )
+        block = f"{frame['file']}:{frame['line']}{where}\n{body}"
+        if used + len(block) > budget:
+            break
+        blocks.append(block)
+        used += len(block)
+
+    return "\n\n".join(blocks)
+
+def trim_error_output(error_text: str, budget: int = 6000) -> str:
+    """
+    Keep the informative end of long error output.
+
+    The last traceback is kept whole when it fits; otherwise the tail is kept.
+
+    Args:
+        error_text: Error output
+        budget: Maximum characters
+
+    Returns:
+        Trimmed error output
+    """
+    if len(error_text) <= budget:
+        return error_text
+
+    start = error_text.rfind("Traceback (most recent call last):")
+    if start != -1 and len(error_text) - start <= budget:
+        return "[... earlier output omitted ...]\n" + error_text[start:]
+    return "[... earlier output omitted ...]\n" + error_text[-budget:]
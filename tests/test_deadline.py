@@ -0,0 +1,41 @@
+"""Tests for the deadline fallback path of `explain`."""
+
+import time
+
+from termexplain.cli import fetch_before_deadline
+from termexplain.fake_backend import FakeModel
+from termexplain.gemini_client import GeminiClient
+from termexplain.prompt_builder import PromptBuilder
+from termexplain.utils.cache import ErrorCache
+
+ERROR = "ModuleNotFoundError: No module named 'requests'"
+
+def fetch(model, cache, deadline=0.3):
+    client = GeminiClient(model=model)
+    builder = PromptBuilder()
+    return fetch_before_deadline(ERROR, builder.build_prompt(ERROR), client, builder, cache, None,
+                                 time.monotonic() + deadline)
+
+def test_answer_before_deadline_is_not_degraded(tmp_path):
+    explanation, degraded = fetch(FakeModel(latency=0.01), ErrorCache(str(tmp_path)))
+
+    assert "fake backend" in explanation
+    assert degraded is None
+
+def test_slow_backend_falls_back_to_offline_explanation(tmp_path):
+    start = time.monotonic()
+    explanation, degraded = fetch(FakeModel(latency=5.0), ErrorCache(str(tmp_path)))
+
+    assert time.monotonic() - start < 1.0
+    assert "deadline" in degraded
+    assert "offline explanation" in degraded
+    assert explanation
+
+def test_slow_backend_falls_back_to_near_match(tmp_path):
+    cache = ErrorCache(str(tmp_path))
+    cache.save("ModuleNotFoundError: No module named 'request'", "Install the package")
+
+    explanation, degraded = fetch(FakeModel(latency=5.0), cache)
+
+    assert explanation == "Install the package"
+    assert "similar cached error" in degraded
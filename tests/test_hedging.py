@@ -0,0 +1,55 @@
+"""Tests for hedged requests in GeminiClient."""
+
+import time
+
+from termexplain.fake_backend import FakeModel
+from termexplain.gemini_client import GeminiClient, HedgingPolicy
+
+def make_client(primary, alternate=None, **policy):
+    options = dict(percentile=0.95, min_delay=0.05, max_delay=1.0, default_delay=0.1, min_samples=5, deadline=5.0)
+    options.update(policy)
+    return GeminiClient(model=primary, alternate_model=alternate, hedging=HedgingPolicy(**options))
+
+def test_fast_primary_sends_no_hedge():
+    client = make_client(FakeModel(latency=0.01))
+
+    assert "fake backend" in client.get_explanation("Error: boom")
+    assert client.hedges_sent == 0
+    assert client.cancelled == 0
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary = FakeModel(latency=2.0)
+    alternate = FakeModel(latency=0.01)
+    client = make_client(primary, alternate)
+
+    start = time.monotonic()
+    client.get_explanation("Error: boom")
+
+    assert time.monotonic() - start < 1.0
+    assert client.hedges_sent == 1
+    assert client.hedge_wins == 1
+    assert client.cancelled == 1
+    # The losing attempt is told to stop instead of running to completion
+    deadline = time.monotonic() + 1.0
+    while primary.cancelled == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert primary.cancelled == 1
+    assert primary.completed == 0
+
+def test_only_primary_latency_feeds_threshold():
+    primary = FakeModel(latency=0.3)
+    alternate = FakeModel(latency=0.01)
+    client = make_client(primary, alternate, default_delay=0.05)
+
+    for _ in range(3):
+        client.get_explanation("Error: boom")
+
+    # Every request was won by the hedge, but the threshold only sees how
+    # long the (cancelled) primary ran, never the fast hedge's answer
+    assert client.hedge_wins == 3
+    # The last primary records its latency once it sees the cancellation
+    deadline = time.monotonic() + 1.0
+    while len(client.latency) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(client.latency) == 3
+    assert min(client.latency._samples) >= 0.05
@@ -0,0 +1,47 @@
+"""Tests for cross-process single-flight."""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+from termexplain.utils.singleflight import SingleFlight
+
+WORKER = textwrap.dedent("""
+    import sys, time
+    from termexplain.utils.singleflight import SingleFlight
+
+    def fetch():
+        time.sleep(0.5)
+        return "explanation"
+
+    result, shared = SingleFlight(sys.argv[1]).do("key", fetch)
+    print(result, shared)
+""")
+
+def run_workers(lock_dir, count):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    workers = [
+        subprocess.Popen([sys.executable, "-c", WORKER, lock_dir], stdout=subprocess.PIPE, text=True, env=env)
+        for _ in range(count)
+    ]
+    return [worker.communicate(timeout=30)[0].split() for worker in workers]
+
+def test_concurrent_processes_share_one_call(tmp_path):
+    outputs = run_workers(str(tmp_path), 5)
+
+    assert all(result == "explanation" for result, _ in outputs)
+    assert sorted(shared for _, shared in outputs) == ["False"] + ["True"] * 4
+    # Leases, results and waiter markers are all cleaned up
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".lock")] == []
+
+def test_sequential_calls_are_not_shared(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    calls = []
+
+    for _ in range(2):
+        result, shared = flight.do("key", lambda: calls.append(1) or "explanation")
+        assert result == "explanation"
+        assert not shared
+    assert len(calls) == 2
@@ -0,0 +1,47 @@
+"""Tests for the compressed entry store."""
+
+import multiprocessing
+
+from termexplain.utils.store import CompressedStore
+
+def append_entries(path, worker, count):
+    store = CompressedStore(path)
+    for i in range(count):
+        store[f"{worker}-{i}"] = {'explanation': f"explanation {worker} {i}", 'timestamp': 1700000000.0 + i}
+
+def test_concurrent_appends_keep_every_entry(tmp_path):
+    path = str(tmp_path / "error_logs.bin")
+    CompressedStore(path)
+    workers = [multiprocessing.Process(target=append_entries, args=(path, w, 50)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    store = CompressedStore(path)
+    assert len(store) == 200
+    assert store["3-49"]['explanation'] == "explanation 3 49"
+
+def test_rewrite_drops_dead_records_and_keeps_entries(tmp_path):
+    path = str(tmp_path / "error_logs.bin")
+    store = CompressedStore(path)
+    for i in range(20):
+        store[f"key-{i}"] = {'explanation': f"explanation {i}", 'timestamp': 1700000000.0}
+    for i in range(10):
+        store[f"key-{i}"] = {'explanation': f"updated {i}", 'timestamp': 1700000001.0}
+    del store["key-19"]
+    assert store.dead_records > 0
+
+    other = CompressedStore(path)
+    store.rewrite()
+
+    assert store.dead_records == 0
+    assert len(store) == 19
+    assert store["key-0"]['explanation'] == "updated 0"
+    assert store["key-10"]['explanation'] == "explanation 10"
+    # A process that loaded before the rewrite picks up the new file
+    other["key-20"] = {'explanation': "explanation 20", 'timestamp': 1700000002.0}
+    store.refresh()
+    assert len(store) == 20
+    assert store["key-20"]['explanation'] == "explanation 20"
@@ -0,0 +1,52 @@
+"""Tests for the tiered cache over a local shared-cache server."""
+
+import threading
+
+import pytest
+
+from termexplain.utils.cache import ErrorCache
+from termexplain.utils.kvserver import KeyValueServer
+from termexplain.utils.tiered_cache import RemoteCache, TieredCache
+
+ERROR = "ModuleNotFoundError: No module named 'requests'"
+
+@pytest.fixture
+def server():
+    server = KeyValueServer(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_cache(server, cache_dir, write_behind=True):
+    remote = RemoteCache(f"127.0.0.1:{server.server_address[1]}")
+    return TieredCache(ErrorCache(str(cache_dir)), remote, write_behind=write_behind)
+
+def test_write_behind_reaches_disk_and_shared_tier(server, tmp_path):
+    cache = make_cache(server, tmp_path / "a")
+
+    cache.save(ERROR, "Install requests")
+    cache.flush()
+
+    assert ErrorCache(str(tmp_path / "a")).get(ERROR) == "Install requests"
+    assert cache.remote.get(cache.cache_key(ERROR)) == "Install requests"
+
+def test_read_through_promotes_shared_hits(server, tmp_path):
+    writer = make_cache(server, tmp_path / "a")
+    writer.save(ERROR, "Install requests")
+    writer.flush()
+
+    reader = make_cache(server, tmp_path / "b")
+    assert reader.get(ERROR) == "Install requests"
+    assert reader.get(ERROR) == "Install requests"
+    reader.flush()
+
+    assert reader.get_stats() == {'l1_hits': 1, 'l2_hits': 0, 'l3_hits': 1, 'misses': 0}
+    # The shared hit was written back to this machine's disk tier
+    assert ErrorCache(str(tmp_path / "b")).get(ERROR) == "Install requests"
+
+def test_miss_in_every_tier(server, tmp_path):
+    cache = make_cache(server, tmp_path / "a", write_behind=False)
+
+    assert cache.get(ERROR) is None
+    assert cache.get_stats()['misses'] == 1